@@ -0,0 +1,120 @@
+"""Shared fixtures for the MyPlaceIQ benchmarks.
+
+Run from the repository root with Home Assistant and pytest-benchmark
+installed::
+
+    python -m pytest benchmarks --benchmark-autosave
+
+and compare a later run against the saved one with ``--benchmark-compare``.
+Each benchmark also records tracemalloc figures for one call in its
+``extra_info``.
+"""
+# pylint: disable=redefined-outer-name
+import json
+import os
+import sys
+import tracemalloc
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("pytest_benchmark")
+pytest.importorskip("homeassistant")
+
+# pylint: disable=wrong-import-position
+from custom_components.myplaceiq import button, climate, sensor
+from custom_components.myplaceiq.const import DOMAIN
+from custom_components.myplaceiq.coordinator import MyPlaceIQDataUpdateCoordinator
+from custom_components.myplaceiq.myplaceiq import MyPlaceIQ
+from tools.hub_simulator import build_state
+from tests.fixtures import hass, loop # pylint: disable=unused-import
+
+# Zones in the synthetic GetFullDataEvent payloads
+ZONE_COUNTS = (1, 10, 50, 200)
+PLATFORMS = (sensor, climate, button)
+
+class CannedMyPlaceIQ(MyPlaceIQ):
+    """Client that answers every command with one canned reply frame.
+
+    The frame goes through the real decoding path, so refresh benchmarks
+    include the codec but not the network.
+    """
+
+    def __init__(self, hass, frame: str) -> None:
+        """Initialize the client with the raw reply frame."""
+        super().__init__(hass, "127.0.0.1", 8086, "bench", "bench")
+        self._frame = frame
+
+    async def send_command(self, command):
+        """Return the canned reply, decoded as if it came off the socket."""
+        return self._decode_frame(self._frame)
+
+class BenchConfigEntry:
+    """Just enough of a ConfigEntry for platform setup."""
+
+    def __init__(self, entry_id: str) -> None:
+        """Initialize the entry."""
+        self.entry_id = entry_id
+        self.title = "MyPlaceIQ 127.0.0.1:8086"
+        self.data = {"host": "127.0.0.1", "port": 8086}
+        self.unload_callbacks = []
+
+    def async_on_unload(self, func) -> None:
+        """Collect unload callbacks like ConfigEntry does."""
+        self.unload_callbacks.append(func)
+
+@pytest.fixture(params=ZONE_COUNTS, ids=lambda count: f"{count}zones")
+def zone_count(request):
+    """Number of zones in the payload."""
+    return request.param
+
+@pytest.fixture
+def frame(zone_count):
+    """Raw GetFullDataEvent reply frame with ``zone_count`` zones."""
+    state = build_state(aircons=1 + zone_count // 50, zones=zone_count)
+    return json.dumps({"uuid": "bench", "body": json.dumps(state)})
+
+@pytest.fixture
+def config_entry():
+    """Config entry the benchmark entities belong to."""
+    return BenchConfigEntry("bench")
+
+@pytest.fixture
+def coordinator(hass, loop, frame, config_entry):
+    """Coordinator holding the snapshot parsed from ``frame``."""
+    instance = MyPlaceIQDataUpdateCoordinator(
+        hass, CannedMyPlaceIQ(hass, frame), update_interval=60)
+    loop.run_until_complete(instance.async_refresh())
+    hass.data[DOMAIN][config_entry.entry_id] = {"coordinator": instance}
+    return instance
+
+def setup_platforms(hass, loop, config_entry):
+    """Run every platform's setup and return the entities it created."""
+    entities = []
+    for platform in PLATFORMS:
+        loop.run_until_complete(
+            platform.async_setup_entry(hass, config_entry, entities.extend))
+    return entities
+
+@pytest.fixture
+def entities(hass, loop, coordinator, config_entry):
+    """Every entity the platforms create for the payload."""
+    # pylint: disable=unused-argument
+    return setup_platforms(hass, loop, config_entry)
+
+@pytest.fixture
+def record_allocations(benchmark):
+    """Return a function that records tracemalloc figures for one call."""
+    def record(func, *args):
+        tracemalloc.start()
+        try:
+            func(*args)
+            _, peak = tracemalloc.get_traced_memory()
+            retained = tracemalloc.take_snapshot().statistics("filename")
+        finally:
+            tracemalloc.stop()
+        benchmark.extra_info["peak_kib"] = round(peak / 1024, 1)
+        benchmark.extra_info["retained_kib"] = round(sum(stat.size for stat in retained) / 1024, 1)
+        benchmark.extra_info["retained_blocks"] = sum(stat.count for stat in retained)
+    return record
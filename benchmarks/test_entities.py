@@ -0,0 +1,46 @@
+"""Benchmarks for entity state properties and platform setup."""
+import json
+
+from homeassistant.components.climate import ClimateEntity
+from homeassistant.components.sensor import SensorEntity
+
+from custom_components.myplaceiq.models import MyPlaceIQSnapshot
+from .conftest import setup_platforms
+
+# Snapshots published, and first reads timed, per property benchmark
+PROPERTY_ROUNDS = 50
+
+def read_properties(entities):
+    """Read every state property Home Assistant reads when writing state."""
+    for entity in entities:
+        if isinstance(entity, SensorEntity):
+            _ = entity.state
+            _ = entity.extra_state_attributes
+        elif isinstance(entity, ClimateEntity):
+            _ = entity.current_temperature
+            _ = entity.target_temperature
+            _ = entity.hvac_mode
+
+def test_entity_properties(benchmark, record_allocations, frame, coordinator, entities):
+    """First read of every state property after a refresh published a new snapshot."""
+    body = json.loads(json.loads(frame)["body"])
+
+    def publish():
+        # Parsed outside the timed read; a new snapshot starts with cold caches
+        coordinator.data = coordinator.hub_data = MyPlaceIQSnapshot.from_body(body)
+        return (entities,), {}
+
+    publish()
+    record_allocations(read_properties, entities)
+    benchmark.pedantic(read_properties, setup=publish, rounds=PROPERTY_ROUNDS)
+
+def test_entity_properties_cached(benchmark, entities):
+    """Repeated reads of every state property on the same snapshot."""
+    read_properties(entities)
+    benchmark(read_properties, entities)
+
+def test_platform_setup(benchmark, record_allocations, hass, loop, coordinator, config_entry):
+    """Entity construction by the sensor, climate and button platform setups."""
+    # pylint: disable=unused-argument, too-many-arguments, too-many-positional-arguments
+    record_allocations(setup_platforms, hass, loop, config_entry)
+    benchmark(setup_platforms, hass, loop, config_entry)
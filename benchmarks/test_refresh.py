@@ -0,0 +1,13 @@
+"""Benchmarks for the coordinator refresh path."""
+# pylint: disable=protected-access
+def test_async_update_data(benchmark, record_allocations, loop, coordinator):
+    """A full refresh: frame decoding, snapshot parsing and overlay reconciliation."""
+    def refresh():
+        return loop.run_until_complete(coordinator._async_update_data())
+    record_allocations(refresh)
+    benchmark(refresh)
+
+def test_diff_unchanged(benchmark, loop, coordinator):
+    """Diffing a freshly parsed but unchanged snapshot against the published one."""
+    snapshot = loop.run_until_complete(coordinator._async_update_data())
+    benchmark(snapshot.diff, coordinator.data)
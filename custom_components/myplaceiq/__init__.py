@@ -2,15 +2,20 @@ import logging
 from datetime import timedelta
 from homeassistant.core import HomeAssistant
 from homeassistant.config_entries import ConfigEntry
+from homeassistant.exceptions import ConfigEntryNotReady
 from .const import (
     DOMAIN,
     CONF_HOST,
     CONF_PORT,
     CONF_CLIENT_ID,
     CONF_CLIENT_SECRET,
-    CONF_POLL_INTERVAL
+    CONF_POLL_INTERVAL,
+    CONF_IDLE_POLL_INTERVAL,
+    CONF_PUSH_UPDATES,
+    DEFAULT_IDLE_POLL_INTERVAL
 )
-from .coordinator import MyPlaceIQDataUpdateCoordinator
+from .coordinator import MyPlaceIQDataUpdateCoordinator, snapshot_store
+from .hub_manager import async_get_hub_manager
 from .myplaceiq import MyPlaceIQ
 
 logger = logging.getLogger(__name__)
@@ -31,21 +36,35 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
             logger.warning("Config entry %s is already being set up, skipping", entry.entry_id)
             return False
 
+        manager = async_get_hub_manager(hass)
         myplaceiq = MyPlaceIQ(
             hass=hass,
             host=entry.data[CONF_HOST],
             port=entry.data.get(CONF_PORT, 8086),
             client_id=entry.data[CONF_CLIENT_ID],
-            client_secret=entry.data[CONF_CLIENT_SECRET]
+            client_secret=entry.data[CONF_CLIENT_SECRET],
+            session=manager.session,
+            request_limit=manager.request_limit
         )
         coordinator = MyPlaceIQDataUpdateCoordinator(
             hass,
             myplaceiq,
-            update_interval=entry.options.get(CONF_POLL_INTERVAL, 60)
+            update_interval=entry.options.get(CONF_POLL_INTERVAL, 60),
+            push_updates=entry.options.get(CONF_PUSH_UPDATES, False),
+            idle_interval=entry.options.get(CONF_IDLE_POLL_INTERVAL, DEFAULT_IDLE_POLL_INTERVAL),
+            store=snapshot_store(hass, entry.entry_id)
         )
-        await coordinator.async_refresh()  # Use the recommended method
-        if not coordinator.last_update_success:
-            raise ValueError("Initial data fetch failed")
+        if await coordinator.async_restore_snapshot():
+            # Entities start from the cached snapshot; the hub catches up in the background
+            entry.async_create_background_task(
+                hass, coordinator.async_refresh(), f"{DOMAIN} initial refresh {entry.entry_id}")
+        else:
+            await coordinator.async_refresh()  # Use the recommended method
+            if not coordinator.last_update_success:
+                await myplaceiq.close()
+                raise ConfigEntryNotReady("Initial data fetch failed")
+        coordinator.async_set_push_updates(coordinator.push_updates)
+        manager.async_add_hub(entry.entry_id, coordinator)
 
         hass.data[DOMAIN][entry.entry_id] = {
             "coordinator": coordinator,
@@ -54,9 +73,12 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
 
         await hass.config_entries.async_forward_entry_setups(entry,
             ["sensor", "button", "climate"])
-        entry.async_on_unload(entry.add_update_listener(async_reload_entry))
+        entry.async_on_unload(entry.add_update_listener(async_update_options))
         logger.debug("Added update listener for entry: %s", entry.entry_id)
         return True
+    except ConfigEntryNotReady:
+        # Home Assistant logs and schedules the retry
+        raise
     except Exception as err:
         logger.error("Failed to set up MyPlaceIQ integration: %s", err)
         raise
@@ -73,7 +95,9 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         unload_ok = await hass.config_entries.async_unload_platforms(entry,
             ["sensor", "button", "climate"])
         if unload_ok:
-            # Close the WebSocket connection
+            # Send any queued commands, then close the WebSocket connection
+            async_get_hub_manager(hass).async_remove_hub(entry.entry_id)
+            await hass.data[DOMAIN][entry.entry_id]["coordinator"].async_shutdown()
             await hass.data[DOMAIN][entry.entry_id]["myplaceiq"].close()
             # Remove the entry from hass.data
             hass.data[DOMAIN].pop(entry.entry_id, None)
@@ -85,15 +109,31 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         logger.error("Error unloading MyPlaceIQ entry: %s", err)
         return False
 
-async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
-    """Reload the config entry when options are updated."""
-    logger.debug("Reloading MyPlaceIQ entry: %s with new options: %s",
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Delete the cached snapshot of a removed config entry."""
+    await snapshot_store(hass, entry.entry_id).async_remove()
+
+async def async_update_options(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Apply updated settings in place, without reloading platforms or entities."""
+    logger.debug("Applying updated settings for MyPlaceIQ entry: %s with options: %s",
         entry.entry_id, entry.options)
-    # Skip reload if _skip_reload flag is set
-    if entry.options.get("_skip_reload", False):
-        logger.debug("Skipping reload for entry %s due to _skip_reload flag",
-            entry.entry_id)
+    runtime = hass.data.get(DOMAIN, {}).get(entry.entry_id)
+    if runtime is None:
+        logger.warning("Config entry %s not found in hass.data", entry.entry_id)
         return
-    # Ensure the entry is unloaded before setting it up again
-    await async_unload_entry(hass, entry)
-    await async_setup_entry(hass, entry)
+    coordinator = runtime["coordinator"]
+
+    # Host, port or credential changes only swap the hub connection
+    transport_changed = await runtime["myplaceiq"].async_update_connection(
+        host=entry.data[CONF_HOST],
+        port=entry.data.get(CONF_PORT, 8086),
+        client_id=entry.data[CONF_CLIENT_ID],
+        client_secret=entry.data[CONF_CLIENT_SECRET]
+    )
+    coordinator.set_poll_intervals(
+        entry.options.get(CONF_POLL_INTERVAL, 60),
+        entry.options.get(CONF_IDLE_POLL_INTERVAL, DEFAULT_IDLE_POLL_INTERVAL)
+    )
+    coordinator.async_set_push_updates(entry.options.get(CONF_PUSH_UPDATES, False))
+    if transport_changed:
+        await coordinator.async_request_refresh()
@@ -1,134 +1,77 @@
-import json
 import logging
+from functools import partial
 from homeassistant.components.button import ButtonEntity
 from homeassistant.const import EntityCategory
+from homeassistant.core import callback
 from homeassistant.exceptions import HomeAssistantError
 
 from .const import DOMAIN
+from .entity import MyPlaceIQEntity
 
 logger = logging.getLogger(__name__)
 
+# Aircon buttons: action -> (command type, command params)
+AIRCON_BUTTONS = {
+    "toggle": ("SetAirconOnOff", None),
+    "mode_heat": ("SetAirconMode", {"mode": "heat"}),
+    "mode_cool": ("SetAirconMode", {"mode": "cool"}),
+    "mode_dry": ("SetAirconMode", {"mode": "dry"}),
+    "mode_fan": ("SetAirconMode", {"mode": "fan"}),
+}
+
 async def async_setup_entry(hass, config_entry, async_add_entities):
-    # pylint: disable=duplicate-code
     """Set up MyPlaceIQ button entities from a config entry."""
     logger.debug("Setting up button entities for MyPlaceIQ")
     coordinator = hass.data[DOMAIN][config_entry.entry_id]["coordinator"]
-    myplaceiq = hass.data[DOMAIN][config_entry.entry_id]["myplaceiq"]
-    data = coordinator.data
-
-    if not isinstance(data, dict) or not data or "body" not in data:
-        logger.error("Invalid or missing coordinator data: %s", data)
-        return
-
-    try:
-        body = json.loads(data["body"])
-    except (json.JSONDecodeError, TypeError) as err:
-        logger.error("Failed to parse coordinator data body: %s", err)
-        return
-
-    aircons = body.get("aircons", {})
-    zones = body.get("zones", {})
 
-    entities = []
-    # pylint: enable=duplicate-code
-
-    # AC System Buttons (Toggle and Modes)
-    for aircon_id, aircon_data in aircons.items():
-        entities.extend([
-            MyPlaceIQButton(
-                coordinator=coordinator,
-                config_entry=config_entry,
-                myplaceiq=myplaceiq,
-                entity_id=aircon_id,
-                entity_data=aircon_data,
-                action="toggle",
-                command_type="SetAirconOnOff",
-                command_params=None,
-                is_zone=False
-            ),
-            MyPlaceIQButton(
-                coordinator=coordinator,
-                config_entry=config_entry,
-                myplaceiq=myplaceiq,
-                entity_id=aircon_id,
-                entity_data=aircon_data,
-                action="mode_heat",
-                command_type="SetAirconMode",
-                command_params={"mode": "heat"},
-                is_zone=False
-            ),
-            MyPlaceIQButton(
-                coordinator=coordinator,
-                config_entry=config_entry,
-                myplaceiq=myplaceiq,
-                entity_id=aircon_id,
-                entity_data=aircon_data,
-                action="mode_cool",
-                command_type="SetAirconMode",
-                command_params={"mode": "cool"},
-                is_zone=False
-            ),
-            MyPlaceIQButton(
-                coordinator=coordinator,
-                config_entry=config_entry,
-                myplaceiq=myplaceiq,
-                entity_id=aircon_id,
-                entity_data=aircon_data,
-                action="mode_dry",
-                command_type="SetAirconMode",
-                command_params={"mode": "dry"},
-                is_zone=False
-            ),
-            MyPlaceIQButton(
-                coordinator=coordinator,
-                config_entry=config_entry,
-                myplaceiq=myplaceiq,
-                entity_id=aircon_id,
-                entity_data=aircon_data,
-                action="mode_fan",
-                command_type="SetAirconMode",
-                command_params={"mode": "fan"},
-                is_zone=False
-            )
-        ])
+    @callback
+    def discover(data):
+        """Return factories for the buttons the current data calls for."""
+        entities = {}
+        # AC System Buttons (Toggle and Modes)
+        for aircon_id, aircon_data in data.aircons.items():
+            for action, (command_type, command_params) in AIRCON_BUTTONS.items():
+                entities[("aircon", aircon_id, action)] = partial(
+                    MyPlaceIQButton,
+                    coordinator=coordinator,
+                    config_entry=config_entry,
+                    entity_id=aircon_id,
+                    entity_data=aircon_data,
+                    action=action,
+                    command_type=command_type,
+                    command_params=command_params,
+                    is_zone=False
+                )
 
-    # Zone Buttons
-    for aircon_id, aircon_data in aircons.items():
-        for zone_id in aircon_data.get("zoneOrder", []):
-            zone_data = zones.get(zone_id)
-            if (zone_data and
-                zone_data.get("isVisible", False) and
-                zone_data.get("isClickable", False)):
-                entities.append(
-                    MyPlaceIQButton(
-                        coordinator=coordinator,
-                        config_entry=config_entry,
-                        myplaceiq=myplaceiq,
-                        entity_id=zone_id,
-                        entity_data=zone_data,
-                        action="toggle",
-                        command_type="SetZoneOpenClose",
-                        command_params=None,
-                        is_zone=True,
-                        aircon_id=aircon_id
-                    )
+        # Zone Buttons
+        for aircon_id, zone_ids in data.topology.visible_zones.items():
+            for zone_id in zone_ids:
+                if zone_id not in data.topology.clickable_zones:
+                    continue
+                entities[("zone", zone_id, "toggle")] = partial(
+                    MyPlaceIQButton,
+                    coordinator=coordinator,
+                    config_entry=config_entry,
+                    entity_id=zone_id,
+                    entity_data=data.zones[zone_id],
+                    action="toggle",
+                    command_type="SetZoneOpenClose",
+                    command_params=None,
+                    is_zone=True,
+                    aircon_id=aircon_id
                 )
+        return entities
 
-    if entities:
-        async_add_entities(entities)
-        logger.debug("Added %d button entities", len(entities))
-    else:
-        logger.warning("No button entities created; check data structure")
+    config_entry.async_on_unload(
+        coordinator.async_add_entity_platform("button", discover, async_add_entities))
 
-class MyPlaceIQButton(ButtonEntity):
+class MyPlaceIQButton(MyPlaceIQEntity, ButtonEntity):
     # pylint: disable=too-many-instance-attributes
     # pylint: disable=too-many-arguments, too-many-positional-arguments
     """Button for MyPlaceIQ AC or zone control."""
 
-    def __init__(self, coordinator, config_entry, myplaceiq, entity_id, entity_data, action, command_type, command_params, is_zone, aircon_id=None): # pylint: disable=line-too-long
-        super().__init__()
-        self.coordinator = coordinator
-        self._myplaceiq = myplaceiq
+    def __init__(self, coordinator, config_entry, entity_id, entity_data, action, command_type, command_params, is_zone, aircon_id=None): # pylint: disable=line-too-long
+        super().__init__(coordinator)
         self._entity_id = entity_id
         self._config_entry = config_entry
         self._action = action
@@ -136,7 +79,7 @@ class MyPlaceIQButton(ButtonEntity):
         self._command_params = command_params
         self._is_zone = is_zone
         self._aircon_id = aircon_id if is_zone else entity_id
-        self._name = entity_data.get("name", f"{'Zone' if is_zone else 'Aircon'}")
+        self._name = entity_data.name
         self._attr_unique_id = f"{config_entry.entry_id}_{'zone' if is_zone else 'aircon'}_{entity_id}_{action}" # pylint: disable=line-too-long
         self._attr_name = f"{self._name}_{action}".replace(" ", "_").lower()
         self._attr_icon = (
@@ -145,41 +88,32 @@ class MyPlaceIQButton(ButtonEntity):
         )
         self._attr_entity_category = EntityCategory.CONFIG
 
-    def _perform_optimistic_update(self, body, attribute, new_value):
-        """Perform an optimistic update to coordinator.data and refresh the appropriate sensor."""
+    def _optimistic_update(self, data, attribute, new_value):
+        """Return the optimistic update for the coordinator's overlay, or None."""
         entity_type = "zones" if self._is_zone else "aircons"
-        sensor_type = "state" if attribute == "isOn" else "mode"
-        if entity_type in body and self._entity_id in body[entity_type]:
-            body[entity_type][self._entity_id][attribute] = new_value
-            self.coordinator.data = {"body": json.dumps(body)}
-            # Notify the appropriate sensor to update
-            state_sensor_id = f"sensor.{self._name.lower().replace(' ', '_')}_{sensor_type}"
-            self.hass.async_create_task(
-                self.hass.services.async_call(
-                    "homeassistant", "update_entity", {"entity_id": state_sensor_id}
-                )
-            )
+        if self._entity_id in getattr(data, entity_type):
             logger.debug(
-                "Optimistically updated %s %s %s to %s", entity_type[:-1],
+                "Optimistically updating %s %s %s to %s", entity_type[:-1],
                     self._entity_id, attribute, new_value)
-        else:
-            logger.warning(
-                "Could not perform optimistic update for %s %s %s: not found in data",
-                    entity_type[:-1], self._entity_id, attribute)
+            return {(entity_type, self._entity_id): {attribute: new_value}}
+        logger.warning(
+            "Could not perform optimistic update for %s %s %s: not found in data",
+                entity_type[:-1], self._entity_id, attribute)
+        return None
 
     async def async_press(self):
         """Handle button press for AC or zone commands."""
         logger.debug("Button pressed: %s", self._attr_name)
         try:
             data = self.coordinator.data
-            if not isinstance(data, dict) or not data or "body" not in data:
-                raise HomeAssistantError("Invalid or missing coordinator data")
-            body = json.loads(data["body"])
+            if data is None:
+                raise HomeAssistantError("Missing coordinator data")
+            optimistic = None
 
             if self._command_type == "SetAirconOnOff" and self._action == "toggle":
                 # Aircon toggle: dynamically determine isOn
-                aircon = body.get("aircons", {}).get(self._entity_id, {})
-                current_state = aircon.get("isOn", False)
+                aircon = data.aircons.get(self._entity_id)
+                current_state = aircon is not None and aircon.is_on
                 new_state = not current_state
                 command = {
                     "commands": [
@@ -191,13 +125,13 @@ class MyPlaceIQButton(ButtonEntity):
                     ]
                 }
                 # Perform optimistic update
-                self._perform_optimistic_update(body, "isOn", new_state)
+                optimistic = self._optimistic_update(data, "is_on", new_state)
                 logger.debug("Sent toggle command for aircon %s to isOn=%s",
                             self._entity_id, new_state)
             elif self._command_type == "SetZoneOpenClose" and self._action == "toggle":
                 # Zone toggle: dynamically determine isOpen
-                zone = body.get("zones", {}).get(self._entity_id, {})
-                current_state = zone.get("isOn", False)
+                zone = data.zones.get(self._entity_id)
+                current_state = zone is not None and zone.is_on
                 new_state = not current_state
                 command = {
                     "commands": [
@@ -209,7 +143,7 @@ class MyPlaceIQButton(ButtonEntity):
                     ]
                 }
                 # Perform optimistic update
-                self._perform_optimistic_update(body, "isOn", new_state)
+                optimistic = self._optimistic_update(data, "is_on", new_state)
                 logger.debug("Sent toggle command for zone %s to isOpen=%s",
                             self._entity_id, new_state)
             else:
@@ -225,14 +159,15 @@ class MyPlaceIQButton(ButtonEntity):
                 }
                 # Optimistic update for mode changes
                 if self._command_type == "SetAirconMode":
-                    self._perform_optimistic_update(body, "mode", self._command_params["mode"])
+                    optimistic = self._optimistic_update(
+                        data, "mode", self._command_params["mode"])
                 logger.debug("Sent %s command for aircon %s: %s",
                             self._action, self._entity_id, self._command_params)
 
-            await self._myplaceiq.send_command(command)
-            # Schedule a full coordinator refresh to sync with device
-            self.hass.async_create_task(self.coordinator.async_request_refresh())
-        except (json.JSONDecodeError, TypeError, HomeAssistantError) as err:
+            # Batched with other entities' commands; the optimistic update is rolled
+            # back if the batch fails, and the coordinator refreshes afterwards
+            await self.coordinator.async_send_commands(command["commands"], optimistic)
+        except (TypeError, HomeAssistantError) as err:
             logger.error("Failed to send %s command for %s %s: %s",
                         self._action, "zone" if self._is_zone else "aircon", self._entity_id, err)
             raise
@@ -248,5 +183,7 @@ class MyPlaceIQButton(ButtonEntity):
             "model": "Zone" if self._is_zone else "Aircon"
         }
         if self._is_zone:
-            device_info["via_device"] = (DOMAIN, f"{self._config_entry.entry_id}_aircon_{self._aircon_id}") # pylint: disable=line-too-long
+            aircon_id = self._parent_aircon_id(self._entity_id, self._aircon_id)
+            device_info["via_device"] = (
+                DOMAIN, f"{self._config_entry.entry_id}_aircon_{aircon_id}")
         return device_info
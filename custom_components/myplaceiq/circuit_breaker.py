@@ -0,0 +1,118 @@
+import logging
+import random
+import time
+from enum import Enum
+from homeassistant.exceptions import HomeAssistantError
+
+logger = logging.getLogger(__name__)
+
+# Consecutive failed requests that open the circuit
+BREAKER_FAILURE_THRESHOLD = 2
+# Seconds the circuit stays open, doubling after each failed probe
+BREAKER_RESET_BASE = 10
+BREAKER_RESET_MAX = 300
+
+class CircuitState(Enum):
+    """State of a circuit breaker."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+class CircuitOpenError(HomeAssistantError):
+    """Raised instead of contacting a hub that is known to be unreachable."""
+
+class CircuitBreaker:
+    """Stop sending requests to a hub after repeated failures.
+
+    After ``failure_threshold`` consecutive failures the circuit opens and
+    requests fail fast with ``CircuitOpenError``. Once the (jittered,
+    exponentially growing) reset delay has passed, one request is let through
+    as a probe: success closes the circuit, failure opens it for longer.
+    """
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+        reset_base: float = BREAKER_RESET_BASE,
+        reset_max: float = BREAKER_RESET_MAX,
+    ) -> None:
+        """Initialize a closed circuit breaker."""
+        self._name = name
+        self._failure_threshold = failure_threshold
+        self._reset_base = reset_base
+        self._reset_max = reset_max
+        self.state = CircuitState.CLOSED
+        self._failures = 0
+        # Times opened in a row without recovering; drives the backoff
+        self._trips = 0
+        self._retry_at = 0.0
+        self._probing = False
+
+    @property
+    def closed(self) -> bool:
+        """Return True if requests are flowing normally."""
+        return self.state is CircuitState.CLOSED
+
+    def before_request(self) -> bool:
+        """Admit a request, or raise ``CircuitOpenError``.
+
+        Returns True if the request is the half-open probe, whose outcome
+        decides whether the circuit closes again.
+        """
+        if self.state is CircuitState.CLOSED:
+            return False
+        now = time.monotonic()
+        if self.state is CircuitState.OPEN and now >= self._retry_at:
+            logger.debug("Probing MyPlaceIQ hub at %s", self._name)
+            self.state = CircuitState.HALF_OPEN
+        if self.state is CircuitState.HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        raise CircuitOpenError(
+            f"MyPlaceIQ hub at {self._name} is unreachable; "
+            f"retrying in {max(self._retry_at - now, 0):.0f}s")
+
+    def record_success(self) -> None:
+        """Close the circuit after a request succeeded."""
+        if self.state is not CircuitState.CLOSED:
+            logger.info("MyPlaceIQ hub at %s is reachable again", self._name)
+        self.reset()
+
+    def record_failure(self, err: Exception) -> None:
+        """Count a failed request, opening the circuit once the threshold is reached."""
+        self._probing = False
+        self._failures += 1
+        if self.state is CircuitState.HALF_OPEN or self._failures >= self._failure_threshold:
+            self._open(err)
+        else:
+            logger.debug("Request to MyPlaceIQ hub at %s failed (%d/%d): %s",
+                self._name, self._failures, self._failure_threshold, err)
+
+    def abort_probe(self) -> None:
+        """Let another request probe after the probe was cancelled without an outcome."""
+        self._probing = False
+
+    def reset(self) -> None:
+        """Return to the closed state and forget past failures."""
+        self.state = CircuitState.CLOSED
+        self._failures = 0
+        self._trips = 0
+        self._probing = False
+
+    def _open(self, err: Exception) -> None:
+        """Open the circuit for the next backoff delay."""
+        delay = min(self._reset_base * 2 ** self._trips, self._reset_max)
+        # Jitter keeps many clients from probing in lockstep
+        delay *= random.uniform(0.5, 1.0)
+        self._trips += 1
+        self.state = CircuitState.OPEN
+        self._retry_at = time.monotonic() + delay
+        if self._trips == 1:
+            logger.warning("MyPlaceIQ hub at %s is unreachable (%s); pausing requests for %.0fs",
+                self._name, str(err) or type(err).__name__, delay)
+        else:
+            logger.debug("MyPlaceIQ hub at %s is still unreachable (%s); next probe in %.0fs",
+                self._name, str(err) or type(err).__name__, delay)
@@ -1,72 +1,58 @@
-import json
 import logging
+from functools import partial
 from homeassistant.components.climate import ClimateEntity, ClimateEntityFeature, HVACMode
 from homeassistant.const import UnitOfTemperature
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.config_entries import ConfigEntry
 from .const import DOMAIN
+from .entity import MyPlaceIQEntity
 
 logger = logging.getLogger(__name__)
 
+# HVAC mode -> aircon mode understood by the hub
+HUB_MODES = {
+    HVACMode.HEAT: "heat",
+    HVACMode.COOL: "cool",
+    HVACMode.DRY: "dry",
+    HVACMode.FAN_ONLY: "fan",
+}
+
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry, async_add_entities):
     """Set up MyPlaceIQ climate entities from a config entry."""
-    # pylint: disable=duplicate-code
     coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
-    myplaceiq = hass.data[DOMAIN][entry.entry_id]["myplaceiq"]
-    data = coordinator.data
-
-    if not isinstance(data, dict) or not data or "body" not in data:
-        logger.error("Invalid or missing coordinator data: %s", data)
-        return
-
-    try:
-        body = json.loads(data["body"])
-    except (json.JSONDecodeError, TypeError) as err:
-        logger.error("Failed to parse coordinator data body: %s", err)
-        return
-
-    aircons = body.get("aircons", {})
-    zones = body.get("zones", {})
 
-    entities = []
-    # pylint: enable=duplicate-code
-
-    # System climate entity
-    for aircon_id, aircon_data in aircons.items():
-        entities.append(
-            MyPlaceIQClimate(
+    @callback
+    def discover(data):
+        """Return factories for the climate entities the current data calls for."""
+        entities = {}
+        # System climate entity
+        for aircon_id, aircon_data in data.aircons.items():
+            entities[("aircon", aircon_id)] = partial(
+                MyPlaceIQClimate,
                 coordinator=coordinator,
-                myplaceiq=myplaceiq,
                 config_entry=entry,
                 entity_id=aircon_id,
                 entity_data=aircon_data,
                 is_zone=False
             )
-        )
-    # Zone climate entities
-    for aircon_id, aircon_data in aircons.items():
-        for zone_id in aircon_data.get("zoneOrder", []):
-            zone_data = zones.get(zone_id)
-            if zone_data and zone_data.get("isVisible", False):
-                entities.append(
-                    MyPlaceIQClimate(
-                        coordinator=coordinator,
-                        myplaceiq=myplaceiq,
-                        config_entry=entry,
-                        entity_id=zone_id,
-                        entity_data=zone_data,
-                        is_zone=True,
-                        aircon_id=aircon_id
-                    )
+        # Zone climate entities
+        for aircon_id, zone_ids in data.topology.visible_zones.items():
+            for zone_id in zone_ids:
+                entities[("zone", zone_id)] = partial(
+                    MyPlaceIQClimate,
+                    coordinator=coordinator,
+                    config_entry=entry,
+                    entity_id=zone_id,
+                    entity_data=data.zones[zone_id],
+                    is_zone=True,
+                    aircon_id=aircon_id
                 )
+        return entities
 
-    if entities:
-        async_add_entities(entities)
-        logger.debug("Added %d climate entities", len(entities))
-    else:
-        logger.warning("No climate entities created; check data structure")
+    entry.async_on_unload(
+        coordinator.async_add_entity_platform("climate", discover, async_add_entities))
 
-class MyPlaceIQClimate(ClimateEntity):
+class MyPlaceIQClimate(MyPlaceIQEntity, ClimateEntity):
     # pylint: disable=too-many-instance-attributes
     # pylint: disable=too-many-arguments, too-many-positional-arguments
     """Representation of a MyPlaceIQ climate entity for zones or system."""
@@ -77,16 +63,19 @@ class MyPlaceIQClimate(ClimateEntity):
     _attr_max_temp = 30  # Adjust based on MyPlaceIQ specs
     _attr_target_temperature_step = 1.0  # Enforce whole-number increments
 
-    def __init__(self, coordinator, myplaceiq, config_entry, entity_id, entity_data, is_zone, aircon_id=None): # pylint: disable=line-too-long
+    def __init__(self, coordinator, config_entry, entity_id, entity_data, is_zone, aircon_id=None): # pylint: disable=line-too-long
         """Initialize the climate entity."""
-        super().__init__()
-        self.coordinator = coordinator
-        self._myplaceiq = myplaceiq
+        super().__init__(coordinator)
         self._config_entry = config_entry
         self._entity_id = entity_id
         self._is_zone = is_zone
         self._aircon_id = aircon_id if is_zone else entity_id
-        self._name = entity_data.get("name", "Zone" if is_zone else "Aircon")
+        # Zone targets follow the parent aircon's mode, so watch it as well
+        self._change_keys = (
+            (("zones", entity_id), ("aircons", self._aircon_id)) if is_zone else
+            (("aircons", entity_id),)
+        )
+        self._name = entity_data.name
         self._attr_unique_id = f"{config_entry.entry_id}_{'zone' if is_zone else 'aircon'}_{entity_id}_climate" # pylint: disable=line-too-long
         self._attr_name = f"{self._name}_climate".replace(" ", "_").lower()
         self._attr_icon = "mdi:thermostat"
@@ -105,75 +94,88 @@ class MyPlaceIQClimate(ClimateEntity):
             "model": "Zone" if self._is_zone else "Aircon"
         }
         if self._is_zone:
+            aircon_id = self._parent_aircon_id(self._entity_id, self._aircon_id)
             device_info["via_device"] = (
-                DOMAIN, f"{self._config_entry.entry_id}_aircon_{self._aircon_id}")
+                DOMAIN, f"{self._config_entry.entry_id}_aircon_{aircon_id}")
         return device_info
 
     @property
-    def available(self):
-        """Return if entity is available."""
-        return self.coordinator.last_update_success
+    def hvac_modes(self):
+        """Return the HVAC modes, limited to those the aircon reports it allows."""
+        data = self.coordinator.data
+        if self._is_zone or data is None:
+            return self._attr_hvac_modes
+        allowed = data.topology.allowed_modes.get(self._entity_id, ())
+        modes = [hvac_mode for hvac_mode, mode in HUB_MODES.items() if mode in allowed]
+        # Aircons reporting no recognised modes keep the full list
+        return [*modes, HVACMode.OFF] if modes else self._attr_hvac_modes
+
+    def _mode_aircon(self, data):
+        """Return the aircon whose mode applies to this entity, or None."""
+        if not self._is_zone:
+            return data.aircons.get(self._entity_id)
+        return data.aircons.get(self._parent_aircon_id(self._entity_id, self._aircon_id))
+
+    def _target(self, data):
+        """Return the model of this zone or aircon, or None if it is gone."""
+        section = data.zones if self._is_zone else data.aircons
+        return section.get(self._entity_id)
 
     @property
     def current_temperature(self):
         """Return the current temperature."""
         data = self.coordinator.data
-        if not isinstance(data, dict) or not data or "body" not in data:
+        if data is None:
             return None
-        try:
-            body = json.loads(data["body"])
-            target = body.get("zones" if self._is_zone else "aircons", {}).get(self._entity_id, {})
-            return target.get("temperatureSensorValue" if self._is_zone else "actualTemperature")
-        except (json.JSONDecodeError, TypeError) as err:
-            logger.error("Failed to parse current temperature: %s", err)
+        target = self._target(data)
+        if target is None:
             return None
+        return target.temperature if self._is_zone else target.actual_temperature
 
     @property
     def target_temperature(self):
         """Return the target temperature based on the aircon's mode."""
         data = self.coordinator.data
-        if not isinstance(data, dict) or not data or "body" not in data:
-            return None
-        try:
-            body = json.loads(data["body"])
-            aircon = body.get("aircons", {}).get(
-                self._aircon_id if self._is_zone else self._entity_id, {})
-            mode = aircon.get("mode", "heat")  # Default to heat if mode is unset
-            target = body.get("zones" if self._is_zone else "aircons", {}).get(self._entity_id, {})
-            if mode == "heat":
-                return target.get("targetTemperatureHeat")
-            if mode == "cool":
-                return target.get("targetTemperatureCool")
+        if data is None:
             return None
-        except (json.JSONDecodeError, TypeError) as err:
-            logger.error("Failed to parse target temperature: %s", err)
+        target = self._target(data)
+        if target is None:
             return None
+        aircon = self._mode_aircon(data)
+        mode = aircon.mode if aircon is not None and aircon.mode else "heat"
+        if mode == "heat":
+            return target.target_temperature_heat
+        if mode == "cool":
+            return target.target_temperature_cool
+        return None
 
     @property
     def hvac_mode(self):
         """Return the current HVAC mode."""
         data = self.coordinator.data
-        if not isinstance(data, dict) or not data or "body" not in data:
+        if data is None:
             return HVACMode.OFF
-        try:
-            body = json.loads(data["body"])
-            aircon = body.get("aircons", {}).get(
-                self._aircon_id if self._is_zone else self._entity_id, {})
-            if self._is_zone:
-                zone = body.get("zones", {}).get(self._entity_id, {})
-                return HVACMode.OFF if not zone.get("isOn", False) else HVACMode.AUTO
-
-            return (
-                HVACMode.OFF if not aircon.get("isOn", False) else
-                HVACMode.HEAT if aircon.get("mode") == "heat" else
-                HVACMode.COOL if aircon.get("mode") == "cool" else
-                HVACMode.DRY if aircon.get("mode") == "dry" else
-                HVACMode.FAN_ONLY if aircon.get("mode") == "fan" else
-                HVACMode.OFF
-            )
-        except (json.JSONDecodeError, TypeError) as err:
-            logger.error("Failed to parse HVAC mode: %s", err)
+        target = self._target(data)
+        if target is None or not target.is_on:
             return HVACMode.OFF
+        if self._is_zone:
+            return HVACMode.AUTO
+
+        return (
+            HVACMode.HEAT if target.mode == "heat" else
+            HVACMode.COOL if target.mode == "cool" else
+            HVACMode.DRY if target.mode == "dry" else
+            HVACMode.FAN_ONLY if target.mode == "fan" else
+            HVACMode.OFF
+        )
+
+    def _optimistic(self, **changes):
+        """Return optimistic changes to this zone or aircon for the coordinator's overlay.
+
+        They are shown as soon as the command is queued and rolled back if it
+        fails or the hub never confirms them.
+        """
+        return {("zones" if self._is_zone else "aircons", self._entity_id): changes}
 
     async def async_set_temperature(self, **kwargs):
         """Set new target temperature."""
@@ -182,12 +184,10 @@ class MyPlaceIQClimate(ClimateEntity):
             return
 
         data = self.coordinator.data
-        if not isinstance(data, dict) or not data or "body" not in data:
+        if data is None:
             return
-        body = json.loads(data["body"])
-        aircon = body.get("aircons", {}).get(
-            self._aircon_id if self._is_zone else self._entity_id, {})
-        mode = aircon.get("mode", "heat")  # Default to heat if mode is unset
+        aircon = self._mode_aircon(data)
+        mode = aircon.mode if aircon is not None and aircon.mode else "heat"
 
         command = {
             "commands": [{
@@ -201,28 +201,18 @@ class MyPlaceIQClimate(ClimateEntity):
             }]
         }
 
-        # Optimistic update
-        target = body.get("zones" if self._is_zone else "aircons", {}).get(self._entity_id, {})
+        optimistic = None
         if mode == "heat":
-            target["targetTemperatureHeat"] = int(temperature)
+            optimistic = self._optimistic(target_temperature_heat=int(temperature))
         elif mode == "cool":
-            target["targetTemperatureCool"] = int(temperature)
-        if self._is_zone:
-            body["zones"][self._entity_id] = target
-        else:
-            body["aircons"][self._entity_id] = target
-        self.coordinator.data["body"] = json.dumps(body)
-        self.async_write_ha_state()
+            optimistic = self._optimistic(target_temperature_cool=int(temperature))
 
-        await self._myplaceiq.send_command(command)
-        await self.coordinator.async_request_refresh()
+        await self.coordinator.async_send_commands(command["commands"], optimistic)
 
     async def async_set_hvac_mode(self, hvac_mode):
         """Set new HVAC mode."""
-        data = self.coordinator.data
-        if not isinstance(data, dict) or not data or "body" not in data:
+        if self.coordinator.data is None:
             return
-        body = json.loads(data["body"])
 
         if self._is_zone:
             # Zones only support AUTO (on, inherit aircon mode) or OFF
@@ -239,12 +229,14 @@ class MyPlaceIQClimate(ClimateEntity):
                     "isOpen": new_state
                 }]
             }
-            # Optimistic update
-            zone = body.get("zones", {}).get(self._entity_id, {})
-            zone["isOn"] = new_state
-            body["zones"][self._entity_id] = zone
+            optimistic = self._optimistic(is_on=new_state)
         else:
             # System: Set mode and turn on if not OFF, turn off if OFF
+            if hvac_mode not in self.hvac_modes:
+                logger.warning(
+                    "Aircon %s does not allow mode %s", self._entity_id, hvac_mode)
+                return
+            mode = HUB_MODES.get(hvac_mode, "fan")
             commands = []
             if hvac_mode == HVACMode.OFF:
                 commands.append({
@@ -262,29 +254,13 @@ class MyPlaceIQClimate(ClimateEntity):
                     {
                         "__type": "SetAirconMode",
                         "airconId": self._entity_id,
-                        "mode": (
-                            "heat" if hvac_mode == HVACMode.HEAT else
-                            "cool" if hvac_mode == HVACMode.COOL else
-                            "dry" if hvac_mode == HVACMode.DRY else
-                            "fan"
-                        )
+                        "mode": mode
                     }
                 ])
             command = {"commands": commands}
-            # Optimistic update
-            aircon = body.get("aircons", {}).get(self._entity_id, {})
-            aircon["isOn"] = hvac_mode != HVACMode.OFF
-            if hvac_mode != HVACMode.OFF:
-                aircon["mode"] = (
-                    "heat" if hvac_mode == HVACMode.HEAT else
-                    "cool" if hvac_mode == HVACMode.COOL else
-                    "dry" if hvac_mode == HVACMode.DRY else
-                    "fan"
-                )
-            body["aircons"][self._entity_id] = aircon
-
-        self.coordinator.data["body"] = json.dumps(body)
-        self.async_write_ha_state()
+            if hvac_mode == HVACMode.OFF:
+                optimistic = self._optimistic(is_on=False)
+            else:
+                optimistic = self._optimistic(is_on=True, mode=mode)
 
-        await self._myplaceiq.send_command(command)
-        await self.coordinator.async_request_refresh()
+        await self.coordinator.async_send_commands(command["commands"], optimistic)
@@ -0,0 +1,22 @@
+import json
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError: # orjson ships with Home Assistant; fall back to the stdlib
+    orjson = None
+
+if orjson is not None:
+    def json_loads(data: Union[str, bytes]) -> Any:
+        """Decode a JSON document from str or bytes."""
+        return orjson.loads(data) # pylint: disable=no-member
+
+    def json_dumps(obj: Any) -> str:
+        """Encode an object as a compact JSON string."""
+        return orjson.dumps(obj).decode() # pylint: disable=no-member
+else:
+    json_loads = json.loads
+
+    def json_dumps(obj: Any) -> str:
+        """Encode an object as a compact JSON string."""
+        return json.dumps(obj, separators=(",", ":"))
@@ -0,0 +1,93 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Seconds to wait for more commands before sending a batch to the hub
+COMMAND_BATCH_WINDOW = 0.15
+
+def _coalesce_key(command: Dict[str, Any]) -> Tuple[Any, ...]:
+    """Return the key under which a later command replaces an earlier one.
+
+    Commands of the same type for the same zone or aircon set the same
+    attribute, so only the last one needs to reach the hub.
+    """
+    return (command.get("__type"), command.get("zoneId"), command.get("airconId"))
+
+class MyPlaceIQCommandQueue:
+    """Collect commands from many entities into one coalesced hub request.
+
+    Commands queued within ``COMMAND_BATCH_WINDOW`` of each other are sent as a
+    single ``commands`` array, keeping only the last value per (type, target).
+    Every caller waits for the shared response of the batch it joined.
+    """
+
+    def __init__(
+        self,
+        send: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]],
+        on_batch_sent: Optional[
+            Callable[[List[Dict[str, Any]], Dict[str, Any]], None]] = None,
+        window: float = COMMAND_BATCH_WINDOW,
+    ) -> None:
+        """Initialize the queue with the coroutine used to send a batch."""
+        self._send = send
+        self._on_batch_sent = on_batch_sent
+        self._window = window
+        self._queued: Dict[Tuple[Any, ...], Dict[str, Any]] = {}
+        self._waiters: List[asyncio.Future] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._tasks: set = set()
+
+    async def async_send(self, commands: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Queue commands for the next batch and return the hub's response."""
+        loop = asyncio.get_running_loop()
+        for command in commands:
+            key = _coalesce_key(command)
+            # Re-queue at the end so the batch keeps the order of the latest intents
+            self._queued.pop(key, None)
+            self._queued[key] = command
+        future = loop.create_future()
+        self._waiters.append(future)
+        if self._flush_handle is None:
+            self._flush_handle = loop.call_later(self._window, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        """Hand the queued commands to a task that sends them as one batch."""
+        self._flush_handle = None
+        if not self._queued:
+            return
+        commands = list(self._queued.values())
+        waiters, self._waiters = self._waiters, []
+        self._queued = {}
+        task = asyncio.get_running_loop().create_task(self._async_send_batch(commands, waiters))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _async_send_batch(
+        self, commands: List[Dict[str, Any]], waiters: List[asyncio.Future]
+    ) -> None:
+        """Send one batch and resolve every caller waiting on it."""
+        logger.debug("Sending batch of %d command(s) for %d caller(s)",
+            len(commands), len(waiters))
+        try:
+            response = await self._send({"commands": commands})
+        except Exception as err: # pylint: disable=broad-except
+            for future in waiters:
+                if not future.done():
+                    future.set_exception(err)
+            return
+        for future in waiters:
+            if not future.done():
+                future.set_result(response)
+        if self._on_batch_sent is not None:
+            self._on_batch_sent(commands, response)
+
+    async def async_flush(self) -> None:
+        """Send anything still queued now and wait for in-flight batches."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
@@ -1,5 +1,4 @@
 import logging
-from datetime import timedelta
 import voluptuous as vol
 from homeassistant import config_entries
 from homeassistant.core import callback
@@ -9,8 +8,12 @@ from .const import (
     CONF_PORT,
     CONF_CLIENT_ID,
     CONF_CLIENT_SECRET,
-    CONF_POLL_INTERVAL
+    CONF_POLL_INTERVAL,
+    CONF_IDLE_POLL_INTERVAL,
+    CONF_PUSH_UPDATES,
+    DEFAULT_IDLE_POLL_INTERVAL
 )
+from .payload_log import redacted
 
 logger = logging.getLogger(__name__)
 
@@ -22,6 +25,9 @@ CONFIG_SCHEMA = vol.Schema({
     vol.Required(CONF_CLIENT_SECRET): str,
     vol.Optional(CONF_POLL_INTERVAL, default=60):
         vol.All(vol.Coerce(int), vol.Range(min=10, max=300)),
+    vol.Optional(CONF_IDLE_POLL_INTERVAL, default=DEFAULT_IDLE_POLL_INTERVAL):
+        vol.All(vol.Coerce(int), vol.Range(min=10, max=3600)),
+    vol.Optional(CONF_PUSH_UPDATES, default=False): bool,
 })
 
 class MyPlaceIQConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
@@ -33,13 +39,16 @@ class MyPlaceIQConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         """Handle the initial step."""
         errors = {}
         if user_input is not None:
-            logger.debug("Received user input for config flow: %s", user_input)
+            logger.debug("Received user input for config flow: %s", redacted(user_input))
             try:
                 host = user_input[CONF_HOST]
                 port = user_input[CONF_PORT]
                 client_id = user_input[CONF_CLIENT_ID]
                 client_secret = user_input[CONF_CLIENT_SECRET]
                 poll_interval = user_input.get(CONF_POLL_INTERVAL, 60)
+                idle_poll_interval = user_input.get(CONF_IDLE_POLL_INTERVAL,
+                    DEFAULT_IDLE_POLL_INTERVAL)
+                push_updates = user_input.get(CONF_PUSH_UPDATES, False)
 
                 await self.async_set_unique_id(f"{DOMAIN}_{client_id}")
                 self._abort_if_unique_id_configured()
@@ -55,6 +64,8 @@ class MyPlaceIQConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                     },
                     options={
                         CONF_POLL_INTERVAL: poll_interval,
+                        CONF_IDLE_POLL_INTERVAL: idle_poll_interval,
+                        CONF_PUSH_UPDATES: push_updates,
                     },
                 )
             except Exception as err: # pylint: disable=broad-except
@@ -86,7 +97,7 @@ class MyPlaceIQOptionsFlow(config_entries.OptionsFlow):
         errors = {}
         config_entry = self.hass.config_entries.async_get_entry(self._config_entry_id)
         if user_input is not None:
-            logger.debug("Received options input: %s", user_input)
+            logger.debug("Received options input: %s", redacted(user_input))
             try:
                 host = user_input[CONF_HOST]
                 port = user_input[CONF_PORT]
@@ -94,22 +105,25 @@ class MyPlaceIQOptionsFlow(config_entries.OptionsFlow):
                 client_secret = user_input[CONF_CLIENT_SECRET]
                 poll_interval = user_input.get(CONF_POLL_INTERVAL,
                     config_entry.options.get(CONF_POLL_INTERVAL, 60))
+                idle_poll_interval = user_input.get(CONF_IDLE_POLL_INTERVAL,
+                    config_entry.options.get(CONF_IDLE_POLL_INTERVAL, DEFAULT_IDLE_POLL_INTERVAL))
+                push_updates = user_input.get(CONF_PUSH_UPDATES,
+                    config_entry.options.get(CONF_PUSH_UPDATES, False))
 
                 # Validate inputs
                 if not isinstance(poll_interval, int) or poll_interval < 10 or poll_interval > 300:
                     errors[CONF_POLL_INTERVAL] = "invalid_poll_interval"
+                elif (not isinstance(idle_poll_interval, int) or
+                      idle_poll_interval < 10 or idle_poll_interval > 3600):
+                    errors[CONF_IDLE_POLL_INTERVAL] = "invalid_poll_interval"
                 elif not isinstance(port, int) or port < 1 or port > 65535:
                     errors[CONF_PORT] = "invalid_port"
                 else:
                     logger.debug("Updating config entry with new poll_interval: %s", poll_interval)
-                    new_unique_id = f"{DOMAIN}_{client_id}"
-                    if new_unique_id != config_entry.unique_id:
-                        await self.hass.config_entries.async_set_unique_id(
-                            config_entry.entry_id, new_unique_id)
-
-                    # Update the config entry with a flag to skip reload
+                    # The entry's update listener applies these in place, without a reload
                     self.hass.config_entries.async_update_entry(
                         config_entry,
+                        unique_id=f"{DOMAIN}_{client_id}",
                         data={
                             CONF_HOST: host,
                             CONF_PORT: port,
@@ -118,24 +132,8 @@ class MyPlaceIQOptionsFlow(config_entries.OptionsFlow):
                         },
                         options={
                             CONF_POLL_INTERVAL: poll_interval,
-                            "_skip_reload": True,  # Flag to prevent reload
-                        },
-                    )
-
-                    # Manually update the coordinator's update_interval
-                    if config_entry.entry_id in self.hass.data.get(DOMAIN, {}):
-                        coordinator = self.hass.data[DOMAIN][config_entry.entry_id]["coordinator"]
-                        coordinator.update_interval = timedelta(seconds=poll_interval)
-                        await coordinator.async_refresh()
-                        logger.debug("Updated coordinator update_interval to %s seconds",
-                            poll_interval)
-
-                    # Clear the skip_reload flag
-                    self.hass.config_entries.async_update_entry(
-                        config_entry,
-                        options={
-                            CONF_POLL_INTERVAL: poll_interval,
-                            "_skip_reload": False,
+                            CONF_IDLE_POLL_INTERVAL: idle_poll_interval,
+                            CONF_PUSH_UPDATES: push_updates,
                         },
                     )
 
@@ -150,6 +148,9 @@ class MyPlaceIQOptionsFlow(config_entries.OptionsFlow):
         current_client_id = config_entry.data.get(CONF_CLIENT_ID, "")
         current_client_secret = config_entry.data.get(CONF_CLIENT_SECRET, "")
         current_poll_interval = config_entry.options.get(CONF_POLL_INTERVAL, 60)
+        current_idle_poll_interval = config_entry.options.get(CONF_IDLE_POLL_INTERVAL,
+            DEFAULT_IDLE_POLL_INTERVAL)
+        current_push_updates = config_entry.options.get(CONF_PUSH_UPDATES, False)
 
         logger.debug("Showing options form with current poll_interval: %s", current_poll_interval)
         return self.async_show_form(
@@ -162,6 +163,9 @@ class MyPlaceIQOptionsFlow(config_entries.OptionsFlow):
                 vol.Required(CONF_CLIENT_SECRET, default=current_client_secret): str,
                 vol.Optional(CONF_POLL_INTERVAL, default=current_poll_interval):
                     vol.All(vol.Coerce(int), vol.Range(min=10, max=300)),
+                vol.Optional(CONF_IDLE_POLL_INTERVAL, default=current_idle_poll_interval):
+                    vol.All(vol.Coerce(int), vol.Range(min=10, max=3600)),
+                vol.Optional(CONF_PUSH_UPDATES, default=current_push_updates): bool,
             }),
             errors=errors,
         )
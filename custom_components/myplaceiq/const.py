@@ -4,3 +4,11 @@ CONF_PORT = "port"
 CONF_CLIENT_ID = "client_id"
 CONF_CLIENT_SECRET = "client_secret"
 CONF_POLL_INTERVAL = "poll_interval"
+CONF_IDLE_POLL_INTERVAL = "idle_poll_interval"
+CONF_PUSH_UPDATES = "push_updates"
+
+# Slow poll interval (seconds) used while idle, offline or in push mode
+DEFAULT_IDLE_POLL_INTERVAL = 300
+
+# hass.data key of the manager shared by all MyPlaceIQ hubs
+DATA_HUB_MANAGER = f"{DOMAIN}_hub_manager"
@@ -1,43 +1,484 @@
 import logging
-import json
+import time
 from datetime import timedelta
-from homeassistant.core import HomeAssistant
-from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
-from .const import DOMAIN
+from typing import Optional
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers import device_registry as dr, entity_registry as er
+from homeassistant.helpers.debounce import Debouncer
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.storage import Store
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from .codec import json_loads
+from .commands import MyPlaceIQCommandQueue
+from .const import DOMAIN, DEFAULT_IDLE_POLL_INTERVAL
+from .metrics import (
+    COUNT_BUCKETS, ENTITY_WRITES, ENTITY_WRITES_PER_UPDATE, FETCH_DURATION,
+    OPTIMISTIC_ROLLBACKS, PARSE_DURATION
+)
+from .models import MyPlaceIQSnapshot
+from .overlay import OptimisticOverlay
+from .payload_log import PayloadSummary
 
 logger = logging.getLogger(__name__)
 
+# Seconds after a command during which the system counts as active
+ACTIVE_AFTER_COMMAND = 300
+# Seconds to wait after a command before confirming its effect with a full refresh
+POST_COMMAND_REFRESH_DELAY = 3
+# Version of the persisted snapshot cache and seconds to batch writes to it
+SNAPSHOT_STORAGE_VERSION = 1
+SNAPSHOT_SAVE_DELAY = 30
+# Consecutive full-state refreshes an aircon or zone must be missing from
+# before its entities are deleted
+ENTITY_REMOVAL_REFRESHES = 3
+# First element of a discovery key -> snapshot section holding that item
+DISCOVERY_SECTIONS = {"aircon": "aircons", "zone": "zones"}
+
+def snapshot_store(hass: HomeAssistant, entry_id: str) -> Store:
+    """Return the store holding the last known snapshot for a config entry."""
+    return Store(hass, SNAPSHOT_STORAGE_VERSION, f"{DOMAIN}.{entry_id}.snapshot")
+
+def _command_targets(commands):
+    """Return the (section, id) keys the given commands act on."""
+    targets = set()
+    for command in commands:
+        if "zoneId" in command:
+            targets.add(("zones", command["zoneId"]))
+        elif "airconId" in command:
+            targets.add(("aircons", command["airconId"]))
+    return targets
+
+def _state_changes(frame):
+    """Return the aircon/zone state carried by a hub frame, or None."""
+    body = frame.get("body") if isinstance(frame, dict) else None
+    if isinstance(body, (str, bytes)):
+        try:
+            body = json_loads(body)
+        except ValueError:
+            return None
+    if not isinstance(body, dict) or not ("aircons" in body or "zones" in body):
+        return None
+    return body
+
 class MyPlaceIQDataUpdateCoordinator(DataUpdateCoordinator):
     """Class to manage fetching MyPlaceIQ data."""
+    # pylint: disable=too-many-instance-attributes
 
-    def __init__(self, hass: HomeAssistant, myplaceiq, update_interval: int):
+    def __init__(self, hass: HomeAssistant, myplaceiq, update_interval: int,
+                 push_updates: bool = False,
+                 idle_interval: int = DEFAULT_IDLE_POLL_INTERVAL,
+                 store: Optional[Store] = None):
         """Initialize the coordinator."""
+        # pylint: disable=too-many-arguments, too-many-positional-arguments
         self.myplaceiq = myplaceiq
+        # Refresh timings, entity writes and rollbacks sit beside the client's counters
+        self.metrics = myplaceiq.metrics
         self.hass = hass
+        self.push_updates = push_updates
+        self._store = store
+        self.active_interval = update_interval
+        self.idle_interval = max(idle_interval, update_interval)
+        self._last_command = None
+        self._unsub_push = None
+        # (section, id) keys changed in the last published update; None means all
+        self.changed_keys = None
+        self._published = None
+        self._published_success = None
+        self.command_queue = MyPlaceIQCommandQueue(
+            myplaceiq.send_command, self._handle_commands_sent)
+        # Targets of sent commands whose effect the hub has not confirmed yet
+        self._unconfirmed = set()
+        # Last state reported by the hub, before optimistic changes
+        self.hub_data = None
+        self.overlay = OptimisticOverlay()
+        self._unsub_overlay_expiry = None
+        # Entity domain -> (discovery callback, add_entities, discovery key -> unique ID,
+        # discovery key -> full-state refreshes it has been missing from)
+        self._platforms = {}
+        # Unique IDs of entities their platform no longer discovers (a hidden
+        # zone, or an item missing from the hub); shown unavailable
+        self.withdrawn_entities = set()
+        self._synced_topology = None
+        # Set when a refresh fetched the hub's full state, until it is published
+        self._full_state_pending = False
+        # Fraction of the poll interval this hub polls at, staggered across hubs
+        self.poll_phase = None
+        # Poll interval in seconds before the phase shift
+        self.poll_interval = self._select_interval(None)
         logger.debug(
-            "Initializing MyPlaceIQDataUpdateCoordinator with update_interval: %s seconds",
-                update_interval)
+            "Initializing MyPlaceIQDataUpdateCoordinator with poll intervals: %s/%s seconds"
+            " (push updates: %s)", self.active_interval, self.idle_interval, push_updates)
         super().__init__(
             hass,
             logger,
             name=DOMAIN,
-            update_interval=timedelta(seconds=update_interval),
+            update_interval=timedelta(seconds=self.poll_interval),
+        )
+        self._post_command_refresh = Debouncer(
+            hass,
+            logger,
+            cooldown=POST_COMMAND_REFRESH_DELAY,
+            immediate=False,
+            function=self._async_post_command_refresh,
         )
 
-    async def _async_update_data(self):
+    async def _async_update_data(self) -> MyPlaceIQSnapshot:
         """Fetch data from MyPlaceIQ."""
         try:
             logger.debug("Fetching data from MyPlaceIQ")
-            response = await self.myplaceiq.send_command(
-                {"commands": [{"__type": "GetFullDataEvent"}]})
-            if not isinstance(response, dict) or "body" not in response:
-                logger.error("Invalid response from MyPlaceIQ: %s", response)
-                raise ValueError("Invalid response from MyPlaceIQ")
-            # Ensure body is a JSON string
-            if isinstance(response["body"], dict):
-                response["body"] = json.dumps(response["body"])
-            logger.debug("Received data: %s", response)
-            return response
+            # Commands sent before this fetch are confirmed by its result
+            confirmed = set(self._unconfirmed)
+            requested_at = time.monotonic()
+            with self.metrics.timer(FETCH_DURATION):
+                response = await self.myplaceiq.send_command(
+                    {"commands": [{"__type": "GetFullDataEvent"}]})
+            body = response.get("body") if isinstance(response, dict) else None
+            if not isinstance(body, dict) or not (
+                    isinstance(body.get("aircons"), dict) and isinstance(body.get("zones"), dict)):
+                # An ack or truncated reply must not be published as the full state
+                raise ValueError(f"Invalid response from MyPlaceIQ: {PayloadSummary(response)}")
+            with self.metrics.timer(PARSE_DURATION):
+                snapshot = MyPlaceIQSnapshot.from_body(body)
+            logger.debug("Received full state with %d aircon(s) and %d zone(s)",
+                len(snapshot.aircons), len(snapshot.zones))
+            self._unconfirmed -= confirmed
+            self._retune_interval(snapshot)
+            self.hub_data = snapshot
+            self._full_state_pending = True
+            self.overlay.reconcile(snapshot, requested_at)
+            return self.overlay.apply(snapshot)
+        except Exception as err:
+            # Logged once by the base class when the coordinator becomes unavailable
+            logger.debug("Error fetching data: %s", err)
+            # Back off while the hub is unreachable
+            self._retune_interval(None)
+            raise UpdateFailed(f"Error fetching data: {str(err) or type(err).__name__}") from err
+
+    def _select_interval(self, snapshot) -> int:
+        """Return the poll interval in seconds suited to the current activity.
+
+        ``active_interval`` is used while any aircon is on or a command was sent
+        recently, and ``idle_interval`` while everything is off, the hub is
+        unreachable, or pushed events are keeping state current.
+        """
+        if self.push_updates or snapshot is None:
+            return self.idle_interval
+        if self._last_command is not None and (
+                time.monotonic() - self._last_command < ACTIVE_AFTER_COMMAND):
+            return self.active_interval
+        if any(aircon.is_on for aircon in snapshot.aircons.values()):
+            return self.active_interval
+        return self.idle_interval
+
+    @callback
+    def _retune_interval(self, snapshot, reschedule: bool = False) -> None:
+        """Apply the interval for ``snapshot``, shifted onto this hub's poll phase.
+
+        Every refresh passes through here just before the next one is
+        scheduled, so ``update_interval`` always holds the delay to this hub's
+        next phase boundary. A new interval normally takes effect at the next
+        schedule; with ``reschedule`` the pending refresh is moved right away.
+        """
+        interval = self._select_interval(snapshot)
+        changed = interval != self.poll_interval
+        if changed:
+            logger.debug("Adjusting poll interval to %ss", interval)
+            self.poll_interval = interval
+        self.update_interval = timedelta(seconds=self._phased_delay(interval))
+        if changed and reschedule and self._listeners:
+            self._schedule_refresh()
+
+    def _phased_delay(self, interval: float) -> float:
+        """Return the delay from now to the poll phase boundary nearest one interval away."""
+        if self.poll_phase is None:
+            return interval
+        due = self.hass.loop.time() + interval
+        # Move the refresh by at most half an interval to the phase boundary
+        shift = (self.poll_phase * interval - due) % interval
+        if shift > interval / 2:
+            shift -= interval
+        return interval + shift
+
+    @callback
+    def set_poll_phase(self, phase: float) -> None:
+        """Poll at ``phase`` (0 <= phase < 1) of each interval from the next refresh on."""
+        self.poll_phase = phase
+        self.update_interval = timedelta(seconds=self._phased_delay(self.poll_interval))
+
+    @callback
+    def set_poll_intervals(self, update_interval: int, idle_interval: int) -> None:
+        """Change the adaptive polling bounds in place."""
+        self.active_interval = update_interval
+        self.idle_interval = max(idle_interval, update_interval)
+        self._retune_interval(self.data if self.last_update_success else None, reschedule=True)
+
+    @callback
+    def async_update_listeners(self) -> None:
+        """Work out which aircons and zones changed, then notify listeners.
+
+        The new snapshot is diffed against the last one published, so entities
+        can skip writing state when nothing they show has changed.
+        """
+        if self._published_success != self.last_update_success or self._published is None:
+            # Availability flipped or this is the first data: everything is stale
+            self.changed_keys = None
+        elif self.data is not None:
+            self.changed_keys = self.data.diff(self._published)
+        # Only a fresh full state from the hub can show an aircon or zone is gone
+        full_state = self._full_state_pending and self.last_update_success
+        self._full_state_pending = False
+        if self.data is not None and (self.data.topology != self._synced_topology or (
+                full_state and any(missing for *_, missing in self._platforms.values()))):
+            # Entity sets only change with the topology, so skip discovery otherwise
+            self._synced_topology = self.data.topology
+            for domain in list(self._platforms):
+                self._sync_platform_entities(domain, full_state)
+        if self._store is not None and self.last_update_success and (
+                self.hub_data is not None and self.changed_keys != frozenset()):
+            self._store.async_delay_save(self.hub_data.as_dict, SNAPSHOT_SAVE_DELAY)
+        self._published = self.data
+        self._published_success = self.last_update_success
+        # Entities count their own writes while they are notified
+        writes = self.metrics.counter(ENTITY_WRITES)
+        super().async_update_listeners()
+        self.metrics.observe(
+            ENTITY_WRITES_PER_UPDATE, self.metrics.counter(ENTITY_WRITES) - writes, COUNT_BUCKETS)
+
+    @callback
+    def async_add_entity_platform(self, domain: str, discover, async_add_entities):
+        """Keep a platform's entities in step with the aircons and zones in the data.
+
+        ``discover(data)`` returns a map of discovery key to a factory building
+        that entity; keys start with ``("aircon" | "zone", id)`` of the item the
+        entity belongs to. Entities are created for keys not seen before, now
+        and on every update. An entity no longer discovered is withdrawn (shown
+        unavailable) while its item is still in the data, e.g. a hidden zone,
+        and deleted once the item has been missing from the hub's aircons or
+        zones for ``ENTITY_REMOVAL_REFRESHES`` consecutive full-state refreshes.
+        Returns a callback that stops tracking the platform.
+        """
+        self._platforms[domain] = (discover, async_add_entities, {}, {})
+        self._sync_platform_entities(domain)
+
+        @callback
+        def remove_platform() -> None:
+            self._platforms.pop(domain, None)
+
+        return remove_platform
+
+    @callback
+    def _sync_platform_entities(self, domain: str, full_state: bool = False) -> None:
+        """Add and remove a platform's entities to match the current data.
+
+        Removal is only counted for ``full_state`` syncs, which follow a
+        successful full-state refresh; stale, cached or partial data never
+        removes anything.
+        """
+        discover, async_add_entities, known, missing = self._platforms[domain]
+        if self.data is None:
+            return
+        factories = discover(self.data)
+        added = []
+        for key, factory in factories.items():
+            missing.pop(key, None)
+            if key not in known:
+                entity = factory()
+                known[key] = entity.unique_id
+                added.append(entity)
+            self.withdrawn_entities.discard(known[key])
+        if added:
+            async_add_entities(added)
+            logger.debug("Added %d %s entities", len(added), domain)
+        undiscovered = [key for key in known if key not in factories]
+        self.withdrawn_entities.update(known[key] for key in undiscovered)
+        # A hub reporting no aircons at all is taken as a bad reply, not an empty system
+        if not full_state or not self.data.aircons:
+            return
+        removed = []
+        for key in undiscovered:
+            if self._discovered_item_present(key):
+                # Hidden, not gone: keep the entity and its customisations
+                missing.pop(key, None)
+                continue
+            missing[key] = missing.get(key, 0) + 1
+            if missing[key] >= ENTITY_REMOVAL_REFRESHES:
+                removed.append(key)
+        if removed:
+            unique_ids = [known.pop(key) for key in removed]
+            self.withdrawn_entities.difference_update(unique_ids)
+            self._remove_entities(domain, unique_ids)
+            for key in removed:
+                del missing[key]
+            logger.debug("Removed %d %s entities", len(removed), domain)
+
+    def _discovered_item_present(self, key) -> bool:
+        """Return True if the aircon or zone a discovery key belongs to is in the data."""
+        section = DISCOVERY_SECTIONS.get(key[0])
+        return section is not None and key[1] in getattr(self.data, section)
+
+    @callback
+    def _remove_entities(self, domain: str, unique_ids) -> None:
+        """Delete entities from the registry, and their devices once left empty."""
+        registry = er.async_get(self.hass)
+        device_ids = set()
+        for unique_id in unique_ids:
+            entity_id = registry.async_get_entity_id(domain, DOMAIN, unique_id)
+            if entity_id is None:
+                continue
+            device_id = registry.async_get(entity_id).device_id
+            if device_id is not None:
+                device_ids.add(device_id)
+            # Removing the registry entry also removes the live entity
+            registry.async_remove(entity_id)
+        device_registry = dr.async_get(self.hass)
+        for device_id in device_ids:
+            if not er.async_entries_for_device(
+                    registry, device_id, include_disabled_entities=True):
+                device_registry.async_remove_device(device_id)
+
+    async def async_restore_snapshot(self) -> bool:
+        """Load the persisted snapshot as the current data; return True if one was found.
+
+        Lets entities be populated after a restart before the hub has answered.
+        """
+        if self._store is None:
+            return False
+        try:
+            cached = await self._store.async_load()
+            if not isinstance(cached, dict):
+                return False
+            snapshot = MyPlaceIQSnapshot.from_dict(cached)
+        except (HomeAssistantError, TypeError, ValueError) as err:
+            logger.warning("Ignoring unreadable MyPlaceIQ snapshot cache: %s", err)
+            return False
+        logger.debug("Restored cached snapshot with %d aircon(s) and %d zone(s)",
+            len(snapshot.aircons), len(snapshot.zones))
+        self.data = self.hub_data = snapshot
+        self._retune_interval(snapshot)
+        return True
+
+    @callback
+    def has_changed(self, keys) -> bool:
+        """Return True if any of the (section, id) keys changed in the last update."""
+        if self.changed_keys is None:
+            return True
+        return not self.changed_keys.isdisjoint(keys)
+
+    @callback
+    def _publish_overlay(self) -> None:
+        """Publish the hub data with the current optimistic changes merged over it."""
+        self.data = self.overlay.apply(self.hub_data)
+        self.async_update_listeners()
+        if self._unsub_overlay_expiry is not None:
+            self._unsub_overlay_expiry()
+            self._unsub_overlay_expiry = None
+        delay = self.overlay.next_expiry()
+        if delay is not None:
+            self._unsub_overlay_expiry = async_call_later(
+                self.hass, delay, self._handle_overlay_expiry)
+
+    @callback
+    def _handle_overlay_expiry(self, _now) -> None:
+        """Roll back optimistic changes the hub never confirmed."""
+        self._unsub_overlay_expiry = None
+        if self.overlay.expire():
+            self.metrics.increment(OPTIMISTIC_ROLLBACKS)
+            logger.debug("Rolled back unconfirmed optimistic changes")
+        self._publish_overlay()
+
+    async def async_send_commands(self, commands, optimistic=None):
+        """Queue commands for the hub, batched with those from other entities.
+
+        ``optimistic`` maps (section, id) to model fields to show while the
+        commands are in flight. They live in an overlay merged over the last hub
+        snapshot (``hub_data``), so a failed or unconfirmed command rolls back
+        on its own.
+        """
+        token = None
+        if optimistic and self.hub_data is not None:
+            token = self.overlay.set(optimistic)
+            self._publish_overlay()
+        try:
+            response = await self.command_queue.async_send(commands)
         except Exception as err:
-            logger.error("Error fetching data: %s", err)
+            if token is not None and self.overlay.rollback(token):
+                self.metrics.increment(OPTIMISTIC_ROLLBACKS)
+                logger.debug("Rolled back optimistic changes after failed commands")
+                self._publish_overlay()
+            if not self.myplaceiq.available and self.last_update_success:
+                # The breaker opened: show entities unavailable without waiting for a poll
+                self.async_set_update_error(err)
+                self._retune_interval(None)
             raise
+        if token is not None:
+            self.overlay.acknowledge(token)
+        return response
+
+    @callback
+    def _handle_commands_sent(self, commands, response):
+        """Confirm a sent batch from its reply, or schedule a delayed refresh."""
+        self._last_command = time.monotonic()
+        self._retune_interval(self.data)
+        self._unconfirmed |= _command_targets(commands)
+        changes = _state_changes(response)
+        if changes is not None and self.hub_data is not None:
+            self._apply_state_changes(changes)
+        if self._unconfirmed:
+            # Bursts of commands share one refresh once the burst settles
+            self.hass.async_create_task(self._post_command_refresh.async_call())
+
+    async def _async_post_command_refresh(self):
+        """Fetch full state unless the hub already confirmed every command."""
+        if not self._unconfirmed:
+            logger.debug("Commands confirmed by the hub; skipping post-command refresh")
+            return
+        await self.async_refresh()
+
+    @callback
+    def _apply_state_changes(self, changes):
+        """Publish hub-reported state and mark the affected targets confirmed."""
+        keys = {
+            (section, item_id)
+            for section in ("aircons", "zones")
+            for item_id in (changes.get(section) or {})
+        }
+        self._unconfirmed -= keys
+        self.hub_data = self.hub_data.merge(changes)
+        self.overlay.reconcile(self.hub_data, time.monotonic(), keys)
+        self.async_set_updated_data(self.overlay.apply(self.hub_data))
+
+    async def async_shutdown(self) -> None:
+        """Send queued commands and stop scheduled refreshes."""
+        await self.command_queue.async_flush()
+        self._post_command_refresh.async_cancel()
+        if self._unsub_overlay_expiry is not None:
+            self._unsub_overlay_expiry()
+            self._unsub_overlay_expiry = None
+        self.async_set_push_updates(False)
+        await super().async_shutdown()
+
+    @callback
+    def async_set_push_updates(self, enabled: bool) -> None:
+        """Subscribe to or unsubscribe from hub events, retuning the poll interval."""
+        self.push_updates = enabled
+        if enabled and self._unsub_push is None:
+            self._unsub_push = self.myplaceiq.async_add_event_listener(self._handle_push_frame)
+        elif not enabled and self._unsub_push is not None:
+            self._unsub_push()
+            self._unsub_push = None
+        self._retune_interval(self.data if self.last_update_success else None, reschedule=True)
+
+    @callback
+    def _handle_push_frame(self, frame):
+        """Merge an unsolicited state-change frame into the current snapshot."""
+        if self.hub_data is None:
+            logger.debug("Ignoring pushed event before first refresh")
+            return
+        event_body = _state_changes(frame)
+        if event_body is None:
+            logger.debug("Ignoring pushed event without state: %s", PayloadSummary(frame))
+            return
+
+        logger.debug("Applied pushed state change: %s", PayloadSummary(event_body))
+        self._apply_state_changes(event_body)
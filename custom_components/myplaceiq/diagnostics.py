@@ -0,0 +1,38 @@
+from typing import Any, Dict
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+from .const import DOMAIN, CONF_CLIENT_SECRET
+
+TO_REDACT = {CONF_CLIENT_SECRET}
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> Dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
+    myplaceiq = coordinator.myplaceiq
+    data = coordinator.hub_data
+    return {
+        "entry": {
+            "data": async_redact_data(entry.data, TO_REDACT),
+            "options": dict(entry.options),
+        },
+        "connection": {
+            "connected": myplaceiq.connected,
+            "available": myplaceiq.available,
+            "echoes_uuid": myplaceiq.echoes_uuid,
+        },
+        "coordinator": {
+            "last_update_success": coordinator.last_update_success,
+            "poll_interval": coordinator.poll_interval,
+            "poll_phase": coordinator.poll_phase,
+            "push_updates": coordinator.push_updates,
+            "optimistic_changes": bool(coordinator.overlay),
+        },
+        "snapshot": {
+            "aircons": len(data.aircons) if data is not None else 0,
+            "zones": len(data.zones) if data is not None else 0,
+        },
+        "metrics": coordinator.metrics.as_dict(),
+    }
@@ -0,0 +1,33 @@
+from homeassistant.core import callback
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+from .coordinator import MyPlaceIQDataUpdateCoordinator
+from .metrics import ENTITY_WRITES
+
+class MyPlaceIQEntity(CoordinatorEntity):
+    """Base for MyPlaceIQ entities driven by the coordinator.
+
+    Subclasses set ``_change_keys`` to the (section, id) keys their state is
+    derived from; state is only written when one of those keys changed.
+    """
+
+    coordinator: MyPlaceIQDataUpdateCoordinator
+    _change_keys = ()
+
+    @property
+    def available(self):
+        """Return False while the hub is unreachable or this entity's item is hidden or gone."""
+        return super().available and self.unique_id not in self.coordinator.withdrawn_entities
+
+    @callback
+    def _handle_coordinator_update(self):
+        """Write state if the data behind this entity changed."""
+        if self.coordinator.has_changed(self._change_keys):
+            self.coordinator.metrics.increment(ENTITY_WRITES)
+            self.async_write_ha_state()
+
+    def _parent_aircon_id(self, zone_id, default=None):
+        """Return the ID of the aircon a zone belongs to, from the topology index."""
+        data = self.coordinator.data
+        if data is None:
+            return default
+        return data.topology.zone_parents.get(zone_id, default)
@@ -0,0 +1,55 @@
+import asyncio
+import logging
+from typing import Dict
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from .const import DATA_HUB_MANAGER
+
+logger = logging.getLogger(__name__)
+
+# Requests awaiting a reply at once across all hubs; a slot is held from
+# sending until the reply or the command timeout
+MAX_CONCURRENT_REQUESTS = 4
+
+class MyPlaceIQHubManager:
+    """Resources shared by every MyPlaceIQ hub (config entry) on this instance.
+
+    All hub clients use Home Assistant's shared aiohttp session and one
+    limit on requests in flight, and each hub's coordinator polls at its own
+    phase of the poll interval so several hubs never refresh on the same tick.
+    """
+
+    def __init__(self, hass: HomeAssistant, max_requests: int = MAX_CONCURRENT_REQUESTS) -> None:
+        """Initialize the manager."""
+        self.hass = hass
+        self.session = async_get_clientsession(hass)
+        self.request_limit = asyncio.Semaphore(max_requests)
+        self._coordinators: Dict[str, object] = {}
+
+    @callback
+    def async_add_hub(self, entry_id: str, coordinator) -> None:
+        """Register a hub's coordinator and spread out the poll phases."""
+        self._coordinators[entry_id] = coordinator
+        self._stagger()
+
+    @callback
+    def async_remove_hub(self, entry_id: str) -> None:
+        """Forget a hub's coordinator and spread out the remaining poll phases."""
+        if self._coordinators.pop(entry_id, None) is not None:
+            self._stagger()
+
+    @callback
+    def _stagger(self) -> None:
+        """Give each hub an evenly spaced fraction of the interval to poll at."""
+        count = len(self._coordinators)
+        for slot, entry_id in enumerate(sorted(self._coordinators)):
+            self._coordinators[entry_id].set_poll_phase(slot / count)
+        logger.debug("Staggered polling across %d hub(s)", count)
+
+@callback
+def async_get_hub_manager(hass: HomeAssistant) -> MyPlaceIQHubManager:
+    """Return the hub manager, creating it on first use."""
+    manager = hass.data.get(DATA_HUB_MANAGER)
+    if manager is None:
+        manager = hass.data[DATA_HUB_MANAGER] = MyPlaceIQHubManager(hass)
+    return manager
@@ -0,0 +1,116 @@
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Counters
+CONNECTS = "connects"
+RECONNECTS = "reconnects"
+COMMANDS_SENT = "commands_sent"
+COMMAND_ERRORS = "command_errors"
+BYTES_IN = "bytes_in"
+BYTES_OUT = "bytes_out"
+ENTITY_WRITES = "entity_writes"
+OPTIMISTIC_ROLLBACKS = "optimistic_rollbacks"
+# Histograms
+FETCH_DURATION = "full_state_fetch_seconds"
+PARSE_DURATION = "parse_seconds"
+ENTITY_WRITES_PER_UPDATE = "entity_writes_per_update"
+
+# Upper bounds of the histogram buckets; larger values land in an overflow bucket
+TIMING_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+@dataclass(slots=True)
+class Histogram:
+    """Distribution of observed values over fixed buckets."""
+
+    buckets: Tuple[float, ...]
+    counts: List[int] = field(default_factory=list)
+    count: int = 0
+    total: float = 0.0
+    minimum: Optional[float] = None
+    maximum: Optional[float] = None
+    last: Optional[float] = None
+
+    def __post_init__(self) -> None:
+        """Start every bucket, plus the overflow bucket, at zero."""
+        if not self.counts:
+            self.counts = [0] * (len(self.buckets) + 1)
+
+    def observe(self, value: float) -> None:
+        """Record one value."""
+        index = 0
+        while index < len(self.buckets) and value > self.buckets[index]:
+            index += 1
+        self.counts[index] += 1
+        self.count += 1
+        self.total += value
+        self.minimum = value if self.minimum is None else min(self.minimum, value)
+        self.maximum = value if self.maximum is None else max(self.maximum, value)
+        self.last = value
+
+    @property
+    def mean(self) -> Optional[float]:
+        """Return the mean of the observed values, or None before the first."""
+        return self.total / self.count if self.count else None
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the histogram in a JSON-serializable form."""
+        labels = [f"<={bound}" for bound in self.buckets] + ["+Inf"]
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.mean,
+            "min": self.minimum,
+            "max": self.maximum,
+            "last": self.last,
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+class MyPlaceIQMetrics:
+    """Counters and histograms for one hub's connection, refreshes and entities.
+
+    Recording is a dict update, so it is always on; the figures are read by
+    the diagnostics download and the optional diagnostic sensors.
+    """
+
+    def __init__(self) -> None:
+        """Initialize empty metrics."""
+        self.counters: Dict[str, int] = {}
+        self.histograms: Dict[str, Histogram] = {}
+
+    def increment(self, name: str, amount: int = 1) -> None:
+        """Add ``amount`` to a counter."""
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def counter(self, name: str) -> int:
+        """Return a counter's value."""
+        return self.counters.get(name, 0)
+
+    def observe(self, name: str, value: float, buckets: Tuple[float, ...] = TIMING_BUCKETS) -> None:
+        """Record a value in a histogram, creating it with ``buckets`` if needed."""
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram(buckets)
+        histogram.observe(value)
+
+    def histogram(self, name: str) -> Optional[Histogram]:
+        """Return a histogram, or None if nothing was recorded in it yet."""
+        return self.histograms.get(name)
+
+    @contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        """Record the duration of the block in seconds, if it completes."""
+        started = time.perf_counter()
+        yield
+        self.observe(name, time.perf_counter() - started)
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return every counter and histogram in a JSON-serializable form."""
+        return {
+            "counters": dict(self.counters),
+            "histograms": {
+                name: histogram.as_dict() for name, histogram in self.histograms.items()
+            },
+        }
@@ -0,0 +1,275 @@
+from functools import cached_property
+from dataclasses import asdict, dataclass, fields as dataclass_fields, replace
+from types import MappingProxyType
+from typing import Any, Callable, Dict, FrozenSet, Mapping, Optional, Tuple
+from .codec import json_loads
+
+# Hub JSON key -> model field, for the keys the integration uses
+AIRCON_FIELDS: Mapping[str, str] = MappingProxyType({
+    "name": "name",
+    "isOn": "is_on",
+    "mode": "mode",
+    "actualTemperature": "actual_temperature",
+    "targetTemperatureHeat": "target_temperature_heat",
+    "targetTemperatureCool": "target_temperature_cool",
+    "fanSpeedHeat": "fan_speed_heat",
+    "allowedModes": "allowed_modes",
+    "airconState": "aircon_state",
+    "zoneOrder": "zone_order",
+})
+ZONE_FIELDS: Mapping[str, str] = MappingProxyType({
+    "name": "name",
+    "isOn": "is_on",
+    "isVisible": "is_visible",
+    "isClickable": "is_clickable",
+    "temperatureSensorValue": "temperature",
+    "targetTemperatureHeat": "target_temperature_heat",
+    "targetTemperatureCool": "target_temperature_cool",
+    "airconMode": "aircon_mode",
+    "zoneType": "zone_type",
+})
+
+def _fields_from_hub(fields: Mapping[str, str], data: Mapping[str, Any]) -> Dict[str, Any]:
+    """Translate hub keys present in ``data`` to model field values."""
+    values = {}
+    for hub_key, field in fields.items():
+        if hub_key in data:
+            value = data[hub_key]
+            values[field] = tuple(value) if isinstance(value, list) else value
+    return values
+
+@dataclass(frozen=True, slots=True)
+class Aircon:
+    """State of one aircon unit."""
+    # pylint: disable=too-many-instance-attributes
+
+    aircon_id: str
+    name: str = "Aircon"
+    is_on: bool = False
+    mode: Optional[str] = None
+    actual_temperature: Optional[float] = None
+    target_temperature_heat: Optional[float] = None
+    target_temperature_cool: Optional[float] = None
+    fan_speed_heat: Optional[str] = None
+    allowed_modes: Tuple[str, ...] = ()
+    aircon_state: Optional[str] = None
+    zone_order: Tuple[str, ...] = ()
+
+    @classmethod
+    def from_hub(cls, aircon_id: str, data: Mapping[str, Any]) -> "Aircon":
+        """Build an aircon from its entry in the hub's ``aircons`` map."""
+        return cls(aircon_id, **_fields_from_hub(AIRCON_FIELDS, data))
+
+    def apply_hub_changes(self, data: Mapping[str, Any]) -> "Aircon":
+        """Return a copy with partial hub-format changes applied."""
+        return replace(self, **_fields_from_hub(AIRCON_FIELDS, data))
+
+@dataclass(frozen=True, slots=True)
+class Zone:
+    """State of one zone."""
+    # pylint: disable=too-many-instance-attributes
+
+    zone_id: str
+    name: str = "Zone"
+    is_on: bool = False
+    is_visible: bool = False
+    is_clickable: bool = False
+    temperature: Optional[float] = None
+    target_temperature_heat: Optional[float] = None
+    target_temperature_cool: Optional[float] = None
+    aircon_mode: Optional[str] = None
+    zone_type: Optional[str] = None
+
+    @classmethod
+    def from_hub(cls, zone_id: str, data: Mapping[str, Any]) -> "Zone":
+        """Build a zone from its entry in the hub's ``zones`` map."""
+        return cls(zone_id, **_fields_from_hub(ZONE_FIELDS, data))
+
+    def apply_hub_changes(self, data: Mapping[str, Any]) -> "Zone":
+        """Return a copy with partial hub-format changes applied."""
+        return replace(self, **_fields_from_hub(ZONE_FIELDS, data))
+
+SECTION_MODELS = MappingProxyType({"aircons": Aircon, "zones": Zone})
+
+def _build_section(section: str, items: Any) -> Mapping[str, Any]:
+    """Return a read-only map of models built from an aircons/zones map."""
+    if not isinstance(items, dict):
+        return MappingProxyType({})
+    model = SECTION_MODELS[section]
+    return MappingProxyType({
+        item_id: model.from_hub(item_id, item)
+        for item_id, item in items.items()
+        if isinstance(item, dict)
+    })
+
+def _load_section(section: str, items: Any) -> Mapping[str, Any]:
+    """Return a read-only map of models rebuilt from their cached field values."""
+    if not isinstance(items, dict):
+        return MappingProxyType({})
+    model = SECTION_MODELS[section]
+    names = {field.name for field in dataclass_fields(model)}
+    return MappingProxyType({
+        item_id: model(**{
+            name: tuple(value) if isinstance(value, list) else value
+            for name, value in item.items()
+            if name in names
+        })
+        for item_id, item in items.items()
+        if isinstance(item, dict)
+    })
+
+@dataclass(frozen=True, slots=True)
+class Topology:
+    """How zones hang off aircons in one snapshot, indexed for O(1) lookups."""
+
+    # Aircon ID -> IDs of its visible zones, in the hub's zone order
+    visible_zones: Mapping[str, Tuple[str, ...]]
+    # Zone ID -> ID of the aircon listing it in its zone order
+    zone_parents: Mapping[str, str]
+    # Visible zones that can be opened and closed
+    clickable_zones: FrozenSet[str]
+    # Aircon ID -> modes the aircon reports it supports
+    allowed_modes: Mapping[str, Tuple[str, ...]]
+
+    @classmethod
+    def from_sections(
+        cls, aircons: Mapping[str, Aircon], zones: Mapping[str, Zone]
+    ) -> "Topology":
+        """Index the aircons and zones of a snapshot in one pass over the zones."""
+        visible_zones = {}
+        zone_parents = {}
+        clickable_zones = set()
+        for aircon_id, aircon in aircons.items():
+            visible = []
+            for zone_id in aircon.zone_order:
+                zone = zones.get(zone_id)
+                if zone is None:
+                    continue
+                zone_parents.setdefault(zone_id, aircon_id)
+                if zone.is_visible:
+                    visible.append(zone_id)
+                    if zone.is_clickable:
+                        clickable_zones.add(zone_id)
+            visible_zones[aircon_id] = tuple(visible)
+        return cls(
+            visible_zones=MappingProxyType(visible_zones),
+            zone_parents=MappingProxyType(zone_parents),
+            clickable_zones=frozenset(clickable_zones),
+            allowed_modes=MappingProxyType({
+                aircon_id: aircon.allowed_modes for aircon_id, aircon in aircons.items()
+            }),
+        )
+
+@dataclass(frozen=True)
+class MyPlaceIQSnapshot:
+    """Immutable view of the hub state parsed from one GetFullDataEvent body."""
+
+    aircons: Mapping[str, Aircon]
+    zones: Mapping[str, Zone]
+
+    @classmethod
+    def from_body(cls, body: Any) -> "MyPlaceIQSnapshot":
+        """Build a snapshot from a response body (JSON string or dict)."""
+        if isinstance(body, (str, bytes)):
+            body = json_loads(body)
+        if not isinstance(body, dict):
+            raise ValueError("GetFullDataEvent body is not an object")
+        return cls(
+            aircons=_build_section("aircons", body.get("aircons")),
+            zones=_build_section("zones", body.get("zones")),
+        )
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> "MyPlaceIQSnapshot":
+        """Rebuild a snapshot saved with ``as_dict``; unknown fields are ignored."""
+        return cls(
+            aircons=_load_section("aircons", data.get("aircons")),
+            zones=_load_section("zones", data.get("zones")),
+        )
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the model fields as a JSON-serializable dict for storage."""
+        return {
+            section: {item_id: asdict(item) for item_id, item in getattr(self, section).items()}
+            for section in SECTION_MODELS
+        }
+
+    @cached_property
+    def topology(self) -> Topology:
+        """Return the aircon/zone topology, built on first use and kept with the snapshot."""
+        return Topology.from_sections(self.aircons, self.zones)
+
+    @cached_property
+    def _attributes(self) -> Dict[Tuple[str, str, Callable], Mapping[str, Any]]:
+        """Return the cache of derived state attributes, keyed by section, ID and builder."""
+        return {}
+
+    def attributes(
+        self, section: str, item_id: str, build: Callable[[Any], Mapping[str, Any]]
+    ) -> Optional[Mapping[str, Any]]:
+        """Return ``build(item)`` for one aircon or zone, or None if it is gone.
+
+        The result is built once per snapshot and shared by every caller, so
+        it must not be modified.
+        """
+        key = (section, item_id, build)
+        attributes = self._attributes.get(key)
+        if attributes is None:
+            item = getattr(self, section).get(item_id)
+            if item is None:
+                return None
+            attributes = self._attributes[key] = build(item)
+        return attributes
+
+    def merge(self, changes: Dict[str, Any]) -> "MyPlaceIQSnapshot":
+        """Return a new snapshot with partial hub-format aircon/zone changes applied.
+
+        Only the entries named in ``changes`` are rebuilt; untouched entries are
+        shared with this snapshot.
+        """
+        sections = {}
+        for section, model in SECTION_MODELS.items():
+            current = getattr(self, section)
+            updates = changes.get(section) or {}
+            if not updates:
+                sections[section] = current
+                continue
+            merged = dict(current)
+            for item_id, item_changes in updates.items():
+                if not isinstance(item_changes, dict):
+                    continue
+                item = merged.get(item_id)
+                merged[item_id] = (
+                    model.from_hub(item_id, item_changes) if item is None else
+                    item.apply_hub_changes(item_changes)
+                )
+            sections[section] = MappingProxyType(merged)
+        return MyPlaceIQSnapshot(**sections)
+
+    def replace_item(self, section: str, item_id: str, **changes: Any) -> "MyPlaceIQSnapshot":
+        """Return a new snapshot with model fields of one aircon or zone replaced."""
+        current = getattr(self, section)
+        if item_id not in current:
+            return self
+        merged = dict(current)
+        merged[item_id] = replace(merged[item_id], **changes)
+        return replace(self, **{section: MappingProxyType(merged)})
+
+    def diff(self, previous: Optional["MyPlaceIQSnapshot"]) -> FrozenSet[Tuple[str, str]]:
+        """Return the (section, id) keys of entries that differ from ``previous``.
+
+        Entries shared with ``previous`` are skipped by a cheap identity check
+        before falling back to field comparison.
+        """
+        changed = set()
+        for section in SECTION_MODELS:
+            current = getattr(self, section)
+            before = getattr(previous, section) if previous is not None else {}
+            if current is before:
+                continue
+            for item_id, item in current.items():
+                old = before.get(item_id)
+                if old is not item and old != item:
+                    changed.add((section, item_id))
+            changed.update((section, item_id) for item_id in before if item_id not in current)
+        return frozenset(changed)
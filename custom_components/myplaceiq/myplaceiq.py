@@ -1,14 +1,41 @@
-import json
+import asyncio
+import contextlib
 import logging
 import uuid
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, List, Optional
 import aiohttp
 from homeassistant.core import HomeAssistant
+from .circuit_breaker import CircuitBreaker
+from .codec import json_dumps, json_loads
+from .metrics import (
+    BYTES_IN, BYTES_OUT, COMMAND_ERRORS, COMMANDS_SENT, CONNECTS, RECONNECTS, MyPlaceIQMetrics
+)
+from .payload_log import PayloadSummary, log_payload
 
 logger = logging.getLogger(__name__)
 
+# Seconds between WebSocket pings; a missed pong closes the socket so drops are noticed
+HEARTBEAT_INTERVAL = 30
+# Connection attempts made before a command gives up
+RECONNECT_ATTEMPTS = 3
+# Exponential backoff between connection attempts (seconds)
+RECONNECT_BACKOFF_BASE = 1
+RECONNECT_BACKOFF_MAX = 30
+# Seconds a command may take, from queueing for a slot to its reply, before it fails
+COMMAND_TIMEOUT = 15
+# Requests awaiting a reply from one hub at once; further commands wait for a slot
+MAX_PENDING_REQUESTS = 8
+
+def _frame_size(data: Any) -> int:
+    """Return the size of a frame on the wire in bytes."""
+    if isinstance(data, str):
+        # ASCII text, the usual case, is one byte per character
+        return len(data) if data.isascii() else len(data.encode())
+    return len(data)
+
 class MyPlaceIQ:
-    """Class to communicate with MyPlaceIQ API."""
+    """Class to communicate with MyPlaceIQ API over a persistent WebSocket."""
+    # pylint: disable=too-many-instance-attributes
     # pylint: disable=too-many-arguments, too-many-positional-arguments
     def __init__(
         self,
@@ -17,57 +44,373 @@ class MyPlaceIQ:
         port: int,
         client_id: str,
         client_secret: str,
+        session: Optional[aiohttp.ClientSession] = None,
+        request_limit: Optional[asyncio.Semaphore] = None,
+        loads: Callable[[Any], Any] = json_loads,
+        dumps: Callable[[Any], str] = json_dumps,
+        command_timeout: float = COMMAND_TIMEOUT,
     ) -> None:
         """Initialize MyPlaceIQ API client."""
         self.hass = hass
         self._url = f"ws://{host}:{port}/ws"
         self._client_id = client_id
         self._client_secret = client_secret
-        self._session: Optional[aiohttp.ClientSession] = None
+        self._session: Optional[aiohttp.ClientSession] = session
+        # A shared session is never closed here; without one the client owns its own
+        self._owns_session = session is None
+        # Caps requests awaiting a reply at once across every client sharing it
+        self._request_limit = request_limit
+        # orjson when it is installed
+        self._loads = loads
+        self._dumps = dumps
+        # A command with no reply within this many seconds raises TimeoutError
+        self._command_timeout = command_timeout
+        self._window = asyncio.Semaphore(MAX_PENDING_REQUESTS)
+        # Connection, command and traffic counters
+        self.metrics = MyPlaceIQMetrics()
+        self._breaker = CircuitBreaker(f"{host}:{port}")
         self._ws: Optional[aiohttp.ClientWebSocketResponse] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        # Requests awaiting a reply on the current socket, keyed by message uuid;
+        # None marks a request its caller gave up on, whose reply is dropped
+        self._pending: Dict[str, Optional[asyncio.Future]] = {}
+        self._connect_lock = asyncio.Lock()
+        # Callbacks receiving unsolicited frames (hub state-change events)
+        self._event_listeners: List[Callable[[Dict[str, Any]], None]] = []
+        # Whether the hub echoes request uuids in its replies; None until a reply shows
+        self.echoes_uuid: Optional[bool] = None
+        self._reconnect_task: Optional[asyncio.Task] = None
+        # Closes a stalled socket; held so the task is not garbage-collected
+        self._drop_task: Optional[asyncio.Task] = None
+        self._closing = False
         logger.debug("Initialized MyPlaceIQ with URL: %s", self._url)
 
+    @property
+    def available(self) -> bool:
+        """Return False while the circuit breaker holds requests to an unreachable hub."""
+        return self._breaker.closed
+
+    @property
+    def connected(self) -> bool:
+        """Return True if the WebSocket is currently open."""
+        return self._ws is not None and not self._ws.closed
+
+    async def async_update_connection(
+        self, host: str, port: int, client_id: str, client_secret: str
+    ) -> bool:
+        """Point the client at new connection settings, swapping only the socket.
+
+        Returns True if anything changed. Requests in flight on the old socket
+        are retried once on the new one; event listeners stay registered.
+        """
+        url = f"ws://{host}:{port}/ws"
+        if (url, client_id, client_secret) == (self._url, self._client_id, self._client_secret):
+            return False
+        logger.debug("Switching MyPlaceIQ connection from %s to %s", self._url, url)
+        async with self._connect_lock:
+            self._url = url
+            self._client_id = client_id
+            self._client_secret = client_secret
+            self._breaker = CircuitBreaker(f"{host}:{port}")
+            await self._async_drop_connection()
+        return True
+
+    def async_add_event_listener(
+        self, listener: Callable[[Dict[str, Any]], None]
+    ) -> Callable[[], None]:
+        """Register a callback for unsolicited frames and return a remover.
+
+        While a listener is registered the socket is kept open, reconnecting in
+        the background when it drops, so pushed events are not missed.
+        """
+        self._event_listeners.append(listener)
+        if self.echoes_uuid is False:
+            self._warn_no_uuid_echo()
+        if not self.connected:
+            self._schedule_reconnect()
+
+        def remove_listener() -> None:
+            if listener in self._event_listeners:
+                self._event_listeners.remove(listener)
+
+        return remove_listener
+
+    def _schedule_reconnect(self) -> None:
+        """Start a background reconnect if anyone is listening for events."""
+        if self._closing or not self._event_listeners:
+            return
+        if self._reconnect_task is not None and not self._reconnect_task.done():
+            return
+        self._reconnect_task = asyncio.create_task(
+            self._async_reconnect_loop(), name=f"myplaceiq reconnect {self._url}")
+
+    async def _async_reconnect_loop(self) -> None:
+        """Keep trying to reconnect, backing off between rounds."""
+        delay = RECONNECT_BACKOFF_BASE
+        while not self._closing and self._event_listeners and not self.connected:
+            try:
+                await self._async_connect()
+            except (aiohttp.ClientError, OSError) as err:
+                logger.debug("Background reconnect to %s failed: %s; retrying in %ss",
+                    self._url, err, delay)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, RECONNECT_BACKOFF_MAX)
+
+    async def _async_connect(self) -> aiohttp.ClientWebSocketResponse:
+        """Return the open WebSocket, (re)connecting with backoff if needed."""
+        async with self._connect_lock:
+            if self.connected:
+                return self._ws
+            if self._owns_session and (self._session is None or self._session.closed):
+                self._session = aiohttp.ClientSession()
+            delay = RECONNECT_BACKOFF_BASE
+            for attempt in range(1, RECONNECT_ATTEMPTS + 1):
+                try:
+                    logger.debug("Connecting to WebSocket at %s (attempt %d)",
+                        self._url, attempt)
+                    self._ws = await self._session.ws_connect(
+                        self._url,
+                        headers={"client_id": self._client_id, "password": self._client_secret},
+                        heartbeat=HEARTBEAT_INTERVAL,
+                    )
+                    logger.debug("WebSocket connected to %s", self._url)
+                    if self.metrics.counter(CONNECTS):
+                        self.metrics.increment(RECONNECTS)
+                    self.metrics.increment(CONNECTS)
+                    self._pending = {}
+                    self._reader_task = asyncio.create_task(
+                        self._async_read_loop(self._ws, self._pending),
+                        name=f"myplaceiq reader {self._url}")
+                    return self._ws
+                except (aiohttp.ClientError, OSError) as err:
+                    if attempt == RECONNECT_ATTEMPTS:
+                        raise
+                    logger.debug("Connection attempt %d to %s failed: %s; retrying in %ss",
+                        attempt, self._url, err, delay)
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, RECONNECT_BACKOFF_MAX)
+            raise ConnectionError(f"Unable to connect to {self._url}")
+
+    async def _async_drop_connection(self) -> None:
+        """Close the current WebSocket so the next command reconnects."""
+        ws, self._ws = self._ws, None
+        if ws is not None and not ws.closed:
+            await ws.close()
+            logger.debug("WebSocket session closed")
+
+    async def _async_read_loop(
+        self,
+        ws: aiohttp.ClientWebSocketResponse,
+        pending: Dict[str, Optional[asyncio.Future]],
+    ) -> None:
+        """Read frames from the socket and hand each reply to the request awaiting it."""
+        try:
+            async for msg in ws:
+                if msg.type not in (aiohttp.WSMsgType.TEXT, aiohttp.WSMsgType.BINARY):
+                    continue
+                self.metrics.increment(BYTES_IN, _frame_size(msg.data))
+                try:
+                    frame = self._decode_frame(msg.data)
+                except ValueError as err:
+                    logger.warning("Discarding malformed frame from MyPlaceIQ: %s", err)
+                    continue
+                self._dispatch_frame(frame, pending)
+        except Exception as err: # pylint: disable=broad-except
+            logger.debug("WebSocket reader stopped: %s", err)
+        finally:
+            if self._ws is ws:
+                self._ws = None
+            for future in pending.values():
+                if future is not None and not future.done():
+                    future.set_exception(ConnectionError("WebSocket connection closed"))
+            pending.clear()
+            logger.debug("WebSocket reader for %s finished", self._url)
+            self._schedule_reconnect()
+
+    def _decode_frame(self, data: Any) -> Any:
+        """Decode a frame and the JSON document nested in its ``body``, once."""
+        frame = self._loads(data)
+        body = frame.get("body") if isinstance(frame, dict) else None
+        if isinstance(body, (str, bytes)) and body:
+            try:
+                frame["body"] = self._loads(body)
+            except ValueError:
+                # Not every reply carries JSON; keep the raw body
+                pass
+        return frame
+
+    def _dispatch_frame(
+        self, frame: Any, pending: Dict[str, Optional[asyncio.Future]]
+    ) -> None:
+        """Resolve the pending request matching the frame's uuid.
+
+        A frame without a uuid, from a hub not known to echo them, answers the
+        oldest pending request, since replies arrive in request order; with no
+        request pending it is an event.
+        """
+        request_id = frame.get("uuid") if isinstance(frame, dict) else None
+        future = None
+        if request_id in pending:
+            self.echoes_uuid = True
+            future = pending.pop(request_id)
+            if future is None:
+                logger.debug("Dropping late reply to abandoned request %s", request_id)
+                return
+        elif request_id is None and not self.echoes_uuid:
+            future = self._pop_oldest_request(pending)
+            if future is not None and self.echoes_uuid is None:
+                self.echoes_uuid = False
+                if self._event_listeners:
+                    self._warn_no_uuid_echo()
+        if future is None:
+            if not self._event_listeners:
+                logger.debug("Ignoring unsolicited frame from MyPlaceIQ: %s", PayloadSummary(frame))
+                return
+            for listener in list(self._event_listeners):
+                try:
+                    listener(frame)
+                except Exception as err: # pylint: disable=broad-except
+                    logger.error("Error handling event from MyPlaceIQ: %s", err)
+            return
+        if not future.done():
+            future.set_result(frame)
+
+    def _warn_no_uuid_echo(self) -> None:
+        """Warn that pushed events cannot be told apart from replies on this hub."""
+        logger.warning(
+            "MyPlaceIQ at %s does not echo request uuids; with push updates on, an event "
+            "arriving while a command is pending may be taken as its reply", self._url)
+
+    @staticmethod
+    def _pop_oldest_request(
+        pending: Dict[str, Optional[asyncio.Future]]
+    ) -> Optional[asyncio.Future]:
+        """Remove and return the oldest request still awaiting a reply.
+
+        Abandoned requests ahead of it are dropped as well, so a live request
+        never loses its reply to one.
+        """
+        for request_id in list(pending):
+            future = pending.pop(request_id)
+            if future is not None:
+                return future
+        return None
+
     async def send_command(self, command: Dict[str, Any]) -> Dict[str, Any]:
-        """Send a command to MyPlaceIQ and return the response."""
-        if self._session is None:
-            self._session = aiohttp.ClientSession()
+        """Send a command to MyPlaceIQ and return the response.
+
+        Commands are multiplexed over the shared socket, so several may be in
+        flight at once; each reply is matched back to its caller by uuid.
+        Raises ``CircuitOpenError`` without contacting the hub while the circuit
+        breaker is open after repeated failures.
+        """
+        request_id = str(uuid.uuid1())
+        message = {
+            "uuid": request_id,
+            "body": self._dumps(command)
+        }
+        # Fails fast while the hub is known to be unreachable
+        probe = self._breaker.before_request()
+        self.metrics.increment(COMMANDS_SENT, len(command.get("commands", ())))
         try:
-            logger.debug(
-                "Connecting to WebSocket at %s using command: %s",
-                self._url,
-                command
-            )
-            async with self._session.ws_connect(
-                self._url,
-                headers={"client_id": self._client_id, "password": self._client_secret},
-            ) as ws:
-                self._ws = ws
-                message = {
-                    "uuid": str(uuid.uuid1()),
-                    "body": json.dumps(command)
-                }
-                logger.debug("Sending command message: %s", message)
-                await ws.send_json(message)
-                response = await ws.receive_json()
-                logger.debug("Received response: %s", response)
-                return response
+            async with asyncio.timeout(self._command_timeout):
+                response = await self._async_request(request_id, message)
+        except (aiohttp.ClientError, OSError) as err:
+            # Connection failures and timeouts; the breaker decides what is worth a warning
+            self._breaker.record_failure(err)
+            self.metrics.increment(COMMAND_ERRORS)
+            logger.debug("Error sending command: %s", str(err) or type(err).__name__)
+            raise
         except Exception as err:
+            self.metrics.increment(COMMAND_ERRORS)
             logger.error("Error sending command: %s", err)
             raise
         finally:
-            await self.close()
+            if probe:
+                # Cancelled or failed for another reason: let the next request probe
+                self._breaker.abort_probe()
+        self._breaker.record_success()
+        return response
+
+    async def _async_request(self, request_id: str, message: Dict[str, Any]) -> Dict[str, Any]:
+        """Send one message once a window slot is free and wait for its reply."""
+        # A socket reused from an earlier command may have gone stale, so a
+        # failure on it is retried once on a fresh connection.
+        reused = self.connected
+        while True:
+            ws = await self._async_connect()
+            pending = self._pending
+            async with self._window:
+                future = asyncio.get_running_loop().create_future()
+                pending[request_id] = future
+                try:
+                    log_payload(logger, "Sending command", message)
+                    data = self._dumps(message)
+                    self.metrics.increment(BYTES_OUT, _frame_size(data))
+                    # The cross-hub limit is held until the reply arrives; the
+                    # command timeout bounds how long a stalled hub can keep it
+                    async with self._request_slot():
+                        await ws.send_str(data)
+                        response = await future
+                    log_payload(logger, "Received response", response)
+                    return response
+                except (aiohttp.ClientError, ConnectionError) as err:
+                    await self._async_drop_connection()
+                    if not reused:
+                        raise
+                    logger.debug("WebSocket dropped (%s); reconnecting", err)
+                    reused = False
+                finally:
+                    if pending.get(request_id) is future:
+                        # Timed out or cancelled before the reply arrived
+                        self._abandon_request(pending, request_id)
+
+    def _abandon_request(
+        self, pending: Dict[str, Optional[asyncio.Future]], request_id: str
+    ) -> None:
+        """Stop waiting for a reply, dropping the socket if the hub has stalled.
+
+        The entry is kept so a late reply is recognised and dropped rather than
+        taken for an event. Once a full window of requests has gone unanswered
+        the socket is closed, which releases every entry it was holding.
+        """
+        pending[request_id] = None
+        if pending is not self._pending:
+            return
+        abandoned = sum(1 for future in pending.values() if future is None)
+        if abandoned == MAX_PENDING_REQUESTS and (
+                self._drop_task is None or self._drop_task.done()):
+            logger.warning("MyPlaceIQ at %s stopped replying; reconnecting", self._url)
+            self._drop_task = asyncio.create_task(
+                self._async_drop_connection(), name=f"myplaceiq drop {self._url}")
+
+    def _request_slot(self):
+        """Return a context holding one slot of the shared request limit, if any."""
+        if self._request_limit is None:
+            return contextlib.nullcontext()
+        return self._request_limit
 
     async def close(self) -> None:
         """Close the WebSocket connection and session."""
+        self._closing = True
         try:
-            if self._ws and not self._ws.closed:
-                await self._ws.close()
-                logger.debug("WebSocket session closed")
-            if self._session and not self._session.closed:
+            if self._reconnect_task is not None:
+                self._reconnect_task.cancel()
+            await self._async_drop_connection()
+            if self._reader_task is not None:
+                self._reader_task.cancel()
+                try:
+                    await self._reader_task
+                except asyncio.CancelledError:
+                    pass
+            if self._owns_session and self._session and not self._session.closed:
                 await self._session.close()
                 logger.debug("Client session closed")
         except Exception as err: # pylint: disable=broad-except
             logger.error("Error closing WebSocket or session: %s", err)
         finally:
             self._ws = None
-            self._session = None
+            self._reader_task = None
+            self._reconnect_task = None
+            if self._owns_session:
+                self._session = None
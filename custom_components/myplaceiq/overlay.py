@@ -0,0 +1,122 @@
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Mapping, Optional, Tuple
+from .models import MyPlaceIQSnapshot
+
+# Seconds an optimistic change is shown without the hub confirming it
+OPTIMISTIC_TIMEOUT = 30
+
+# (section, id) of an aircon or zone
+ItemKey = Tuple[str, str]
+
+@dataclass(slots=True)
+class PendingChange:
+    """One optimistic field value awaiting confirmation from the hub."""
+
+    value: Any
+    set_at: float
+    # When the hub acknowledged the command behind it, if it has
+    acked_at: Optional[float] = None
+
+# Entries recorded by one ``set`` call, keyed by (item key, field)
+Token = Dict[Tuple[ItemKey, str], PendingChange]
+
+class OptimisticOverlay:
+    """Field-level optimistic changes shown over the last snapshot from the hub.
+
+    Changes are recorded when a command is queued and merged over the real
+    snapshot on read. They are cleared once the hub reports the same value,
+    once hub state fetched after the command was acknowledged says otherwise,
+    when the command fails, or after ``timeout`` seconds.
+    """
+
+    def __init__(self, timeout: float = OPTIMISTIC_TIMEOUT) -> None:
+        """Initialize an empty overlay."""
+        self._timeout = timeout
+        self._changes: Dict[ItemKey, Dict[str, PendingChange]] = {}
+
+    def __bool__(self) -> bool:
+        """Return True if any change is pending."""
+        return bool(self._changes)
+
+    def set(self, changes: Mapping[ItemKey, Mapping[str, Any]]) -> Token:
+        """Record changes and return the entries created, for ``acknowledge``/``rollback``."""
+        now = time.monotonic()
+        token = {}
+        for key, fields in changes.items():
+            item = self._changes.setdefault(key, {})
+            for field, value in fields.items():
+                item[field] = token[(key, field)] = PendingChange(value, now)
+        return token
+
+    def acknowledge(self, token: Token) -> None:
+        """Mark the entries of a token as acknowledged by the hub."""
+        now = time.monotonic()
+        for change in token.values():
+            change.acked_at = now
+
+    def rollback(self, token: Token) -> bool:
+        """Remove the entries of a token not already replaced by newer changes."""
+        removed = False
+        for (key, field), change in token.items():
+            item = self._changes.get(key)
+            if item is not None and item.get(field) is change:
+                del item[field]
+                removed = True
+                if not item:
+                    del self._changes[key]
+        return removed
+
+    def reconcile(
+        self, snapshot: MyPlaceIQSnapshot, as_of: float, keys: Optional[Iterable[ItemKey]] = None
+    ) -> bool:
+        """Drop entries the hub state in ``snapshot`` confirms or supersedes.
+
+        ``as_of`` is when that state was requested; entries acknowledged before
+        then are settled by it whatever the value. ``keys`` limits the check to
+        the items a partial update reported. Returns True if anything changed.
+        """
+        removed = False
+        for key in list(self._changes if keys is None else keys):
+            item = self._changes.get(key)
+            if item is None:
+                continue
+            section, item_id = key
+            real = getattr(snapshot, section).get(item_id)
+            for field, change in list(item.items()):
+                if real is None or getattr(real, field) == change.value or (
+                        change.acked_at is not None and change.acked_at <= as_of):
+                    del item[field]
+                    removed = True
+            if not item:
+                del self._changes[key]
+        return removed
+
+    def expire(self) -> bool:
+        """Roll back entries older than the timeout; return True if any were."""
+        deadline = time.monotonic() - self._timeout
+        removed = False
+        for key, item in list(self._changes.items()):
+            for field, change in list(item.items()):
+                if change.set_at <= deadline:
+                    del item[field]
+                    removed = True
+            if not item:
+                del self._changes[key]
+        return removed
+
+    def next_expiry(self) -> Optional[float]:
+        """Return seconds until the oldest entry expires, or None if there are none."""
+        oldest = min(
+            (change.set_at for item in self._changes.values() for change in item.values()),
+            default=None)
+        if oldest is None:
+            return None
+        return max(oldest + self._timeout - time.monotonic(), 0)
+
+    def apply(self, snapshot: MyPlaceIQSnapshot) -> MyPlaceIQSnapshot:
+        """Return ``snapshot`` with the pending changes merged over it."""
+        for (section, item_id), item in self._changes.items():
+            snapshot = snapshot.replace_item(
+                section, item_id, **{field: change.value for field, change in item.items()})
+        return snapshot
@@ -0,0 +1,90 @@
+import logging
+from typing import Any, Mapping
+from .const import CONF_CLIENT_SECRET
+
+# Characters of a payload kept when it is logged in full
+TRACE_MAX_CHARS = 2000
+
+# Full payloads go to this logger only. It stays quiet when the integration's
+# debug logging is on, and is enabled on its own with
+# ``custom_components.myplaceiq.trace: debug``.
+trace_logger = logging.getLogger(f"{__package__}.trace")
+if trace_logger.level == logging.NOTSET:
+    trace_logger.setLevel(logging.INFO)
+
+def _describe_body(body: Any) -> str:
+    """Return a short description of a decoded hub document."""
+    if not isinstance(body, dict):
+        return type(body).__name__
+    parts = []
+    if isinstance(body.get("aircons"), dict):
+        parts.append(f"{len(body['aircons'])} aircon(s)")
+    if isinstance(body.get("zones"), dict):
+        parts.append(f"{len(body['zones'])} zone(s)")
+    commands = body.get("commands")
+    if isinstance(commands, list):
+        types = ",".join(str(command.get("__type")) for command in commands[:5]
+            if isinstance(command, dict))
+        more = f"+{len(commands) - 5}" if len(commands) > 5 else ""
+        parts.append(f"commands=[{types}{more}]")
+    if not parts:
+        keys = list(body)
+        parts.append(f"keys={keys[:5]}{'...' if len(keys) > 5 else ''}")
+    return " ".join(parts)
+
+class PayloadSummary:
+    """Lazy log argument that describes a hub payload without printing it.
+
+    Nothing is computed unless the record is emitted, and then only sizes,
+    uuids, command types and aircon/zone counts, never the document itself.
+    """
+
+    __slots__ = ("_payload",)
+
+    def __init__(self, payload: Any) -> None:
+        """Wrap the payload."""
+        self._payload = payload
+
+    def __str__(self) -> str:
+        """Return the summary."""
+        payload = self._payload
+        if isinstance(payload, (str, bytes)):
+            return f"<{len(payload)} bytes>"
+        if isinstance(payload, dict) and "body" in payload:
+            body = payload["body"]
+            if isinstance(body, (str, bytes)):
+                description = f"{len(body)} bytes"
+            else:
+                description = _describe_body(body)
+            return f"<uuid={payload.get('uuid')} {description}>"
+        return f"<{_describe_body(payload)}>"
+
+class TruncatedPayload:
+    """Lazy log argument printing a payload cut to ``TRACE_MAX_CHARS``."""
+
+    __slots__ = ("_payload",)
+
+    def __init__(self, payload: Any) -> None:
+        """Wrap the payload."""
+        self._payload = payload
+
+    def __str__(self) -> str:
+        """Return the payload's text, truncated."""
+        text = self._payload if isinstance(self._payload, str) else repr(self._payload)
+        if len(text) <= TRACE_MAX_CHARS:
+            return text
+        return f"{text[:TRACE_MAX_CHARS]}... ({len(text) - TRACE_MAX_CHARS} more chars)"
+
+def log_payload(logger: logging.Logger, message: str, payload: Any) -> None:
+    """Log a summary of ``payload`` at debug level, and the payload itself at trace level."""
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("%s: %s", message, PayloadSummary(payload))
+    if trace_logger.isEnabledFor(logging.DEBUG):
+        trace_logger.debug("%s: %s", message, TruncatedPayload(payload))
+
+def redacted(user_input: Mapping[str, Any]) -> dict:
+    """Return form input with the client secret masked, for logging."""
+    return {
+        key: "**REDACTED**" if key == CONF_CLIENT_SECRET else value
+        for key, value in user_input.items()
+    }
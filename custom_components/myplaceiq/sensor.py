@@ -1,89 +1,99 @@
-import json
 import logging
+from functools import partial
+from types import MappingProxyType
 from homeassistant.components.sensor import SensorEntity, SensorDeviceClass, SensorStateClass
-from homeassistant.const import UnitOfTemperature
-from .const import DOMAIN
+from homeassistant.const import EntityCategory, UnitOfInformation, UnitOfTemperature, UnitOfTime
+from homeassistant.core import callback
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+from .const import CONF_HOST, DOMAIN
+from .entity import MyPlaceIQEntity
+from .metrics import (
+    BYTES_IN, BYTES_OUT, COMMAND_ERRORS, COMMANDS_SENT, CONNECTS, ENTITY_WRITES_PER_UPDATE,
+    FETCH_DURATION, OPTIMISTIC_ROLLBACKS, PARSE_DURATION, RECONNECTS
+)
 
 logger = logging.getLogger(__name__)
 
+# Metric -> (sensor name, icon, unit); histograms report their last value
+METRIC_SENSORS = {
+    CONNECTS: ("connects", "mdi:lan-connect", None),
+    RECONNECTS: ("reconnects", "mdi:lan-pending", None),
+    COMMANDS_SENT: ("commands_sent", "mdi:send", None),
+    COMMAND_ERRORS: ("command_errors", "mdi:alert-circle-outline", None),
+    BYTES_IN: ("bytes_in", "mdi:download-network", UnitOfInformation.BYTES),
+    BYTES_OUT: ("bytes_out", "mdi:upload-network", UnitOfInformation.BYTES),
+    OPTIMISTIC_ROLLBACKS: ("optimistic_rollbacks", "mdi:undo", None),
+    FETCH_DURATION: ("fetch_time", "mdi:timer-outline", UnitOfTime.MILLISECONDS),
+    PARSE_DURATION: ("parse_time", "mdi:timer-outline", UnitOfTime.MILLISECONDS),
+    ENTITY_WRITES_PER_UPDATE: ("entity_writes_per_update", "mdi:pencil", None),
+}
+TIMING_METRICS = (FETCH_DURATION, PARSE_DURATION)
+
+def _aircon_attributes(aircon):
+    """Return the state attributes of an aircon mode sensor."""
+    return MappingProxyType({
+        "is_on": aircon.is_on,
+        "actual_temperature": aircon.actual_temperature,
+        "target_temperature_heat": aircon.target_temperature_heat,
+        "target_temperature_cool": aircon.target_temperature_cool,
+        "fan_speed_heat": aircon.fan_speed_heat,
+        "allowed_modes": aircon.allowed_modes,
+        "aircon_state": aircon.aircon_state
+    })
+
+def _zone_attributes(zone):
+    """Return the state attributes of a zone temperature sensor."""
+    return MappingProxyType({
+        "is_on": zone.is_on,
+        "aircon_mode": zone.aircon_mode,
+        "target_temperature_heat": zone.target_temperature_heat,
+        "target_temperature_cool": zone.target_temperature_cool,
+        "zone_type": zone.zone_type,
+        "is_clickable": zone.is_clickable
+    })
+
 async def async_setup_entry(hass, config_entry, async_add_entities):
     """Set up MyPlaceIQ sensor entities from a config entry."""
-    # pylint: disable=duplicate-code
     logger.debug("Setting up sensor entities for MyPlaceIQ")
     coordinator = hass.data[DOMAIN][config_entry.entry_id]["coordinator"]
-    data = coordinator.data
-
-    if not isinstance(data, dict) or not data or "body" not in data:
-        logger.error("Invalid or missing coordinator data: %s", data)
-        return
-
-    try:
-        body = json.loads(data["body"])
-    except (json.JSONDecodeError, TypeError) as err:
-        logger.error("Failed to parse coordinator data body: %s", err)
-        return
-
-    aircons = body.get("aircons", {})
-    zones = body.get("zones", {})
-
-    entities = []
-    # pylint: enable=duplicate-code
-
-    # AC System Sensors (Mode and State)
-    for aircon_id, aircon_data in aircons.items():
-        entities.extend([
-            MyPlaceIQAirconSensor(
-                coordinator,
-                config_entry,
-                aircon_id,
-                aircon_data
-            ),
-            MyPlaceIQAirconStateSensor(
-                coordinator,
-                config_entry,
-                aircon_id,
-                aircon_data
-            )
-        ])
-
-    # Zone Sensors (Temperature and State)
-    for aircon_id, aircon_data in aircons.items():
-        for zone_id in aircon_data.get("zoneOrder", []):
-            zone_data = zones.get(zone_id)
-            if zone_data and zone_data.get("isVisible", False):
-                entities.extend([
-                    MyPlaceIQZoneSensor(
-                        coordinator,
-                        config_entry,
-                        zone_id,
-                        zone_data,
-                        aircon_id
-                    ),
-                    MyPlaceIQZoneStateSensor(
-                        coordinator,
-                        config_entry,
-                        zone_id,
-                        zone_data,
-                        aircon_id
-                    )
-                ])
-
-    if entities:
-        async_add_entities(entities)
-        logger.debug("Added %d sensor entities", len(entities))
-    else:
-        logger.warning("No sensor entities created; check data structure")
-
-class MyPlaceIQAirconSensor(SensorEntity):
+
+    @callback
+    def discover(data):
+        """Return factories for the sensors the current data calls for."""
+        entities = {}
+        # AC System Sensors (Mode and State)
+        for aircon_id, aircon in data.aircons.items():
+            entities[("aircon", aircon_id, "mode")] = partial(
+                MyPlaceIQAirconSensor, coordinator, config_entry, aircon_id, aircon)
+            entities[("aircon", aircon_id, "state")] = partial(
+                MyPlaceIQAirconStateSensor, coordinator, config_entry, aircon_id, aircon)
+
+        # Zone Sensors (Temperature and State)
+        for aircon_id, zone_ids in data.topology.visible_zones.items():
+            for zone_id in zone_ids:
+                zone = data.zones[zone_id]
+                entities[("zone", zone_id, "temperature")] = partial(
+                    MyPlaceIQZoneSensor, coordinator, config_entry, zone_id, zone, aircon_id)
+                entities[("zone", zone_id, "state")] = partial(
+                    MyPlaceIQZoneStateSensor, coordinator, config_entry, zone_id, zone, aircon_id)
+        return entities
+
+    config_entry.async_on_unload(
+        coordinator.async_add_entity_platform("sensor", discover, async_add_entities))
+    # Hub diagnostics, disabled until enabled in the entity registry
+    async_add_entities(
+        MyPlaceIQMetricSensor(coordinator, config_entry, metric) for metric in METRIC_SENSORS)
+
+class MyPlaceIQAirconSensor(MyPlaceIQEntity, SensorEntity):
     # pylint: disable=too-many-instance-attributes
     """Sensor for MyPlaceIQ AC system mode."""
 
-    def __init__(self, coordinator, config_entry, aircon_id, aircon_data):
-        super().__init__()
-        self.coordinator = coordinator
+    def __init__(self, coordinator, config_entry, aircon_id, aircon):
+        super().__init__(coordinator)
         self._aircon_id = aircon_id
+        self._change_keys = (("aircons", aircon_id),)
         self._config_entry = config_entry
-        self._name = aircon_data.get("name", "Aircon")
+        self._name = aircon.name
         self._attr_unique_id = f"{config_entry.entry_id}_aircon_{aircon_id}_mode"
         self._attr_name = f"{self._name}_mode".replace(" ", "_").lower()
         self._attr_icon = "mdi:air-conditioner"
@@ -94,39 +104,20 @@ class MyPlaceIQAirconSensor(SensorEntity):
     def state(self):
         """Return the state of the AC (mode or off)."""
         data = self.coordinator.data
-        if not isinstance(data, dict) or not data or "body" not in data:
-            logger.debug("Invalid or missing coordinator data for aircon state: %s", data)
+        if data is None:
             return None
-        try:
-            body = json.loads(data["body"])
-            aircon = body.get("aircons", {}).get(self._aircon_id, {})
-            return aircon.get("mode", "unknown") if aircon.get("isOn", False) else "off"
-        except (json.JSONDecodeError, TypeError) as err:
-            logger.error("Failed to parse coordinator data for aircon state: %s", err)
+        aircon = data.aircons.get(self._aircon_id)
+        if aircon is None:
             return None
+        return (aircon.mode or "unknown") if aircon.is_on else "off"
 
     @property
     def extra_state_attributes(self):
-        """Return additional state attributes for the AC."""
+        """Return additional state attributes for the AC, built once per snapshot."""
         data = self.coordinator.data
-        if not isinstance(data, dict) or not data or "body" not in data:
-            logger.debug("Invalid or missing coordinator data for aircon attributes: %s", data)
-            return {}
-        try:
-            body = json.loads(data["body"])
-            aircon = body.get("aircons", {}).get(self._aircon_id, {})
-            return {
-                "is_on": aircon.get("isOn", False),
-                "actual_temperature": aircon.get("actualTemperature"),
-                "target_temperature_heat": aircon.get("targetTemperatureHeat"),
-                "target_temperature_cool": aircon.get("targetTemperatureCool"),
-                "fan_speed_heat": aircon.get("fanSpeedHeat"),
-                "allowed_modes": aircon.get("allowedModes", []),
-                "aircon_state": aircon.get("airconState")
-            }
-        except (json.JSONDecodeError, TypeError) as err:
-            logger.error("Failed to parse coordinator data for aircon attributes: %s", err)
+        if data is None:
             return {}
+        return data.attributes("aircons", self._aircon_id, _aircon_attributes) or {}
 
     @property
     def device_info(self):
@@ -138,16 +129,16 @@ class MyPlaceIQAirconSensor(SensorEntity):
             "model": "Aircon",
         }
 
-class MyPlaceIQAirconStateSensor(SensorEntity):
+class MyPlaceIQAirconStateSensor(MyPlaceIQEntity, SensorEntity):
     # pylint: disable=too-many-instance-attributes
     """Sensor for MyPlaceIQ AC system on/off state."""
 
-    def __init__(self, coordinator, config_entry, aircon_id, aircon_data):
-        super().__init__()
-        self.coordinator = coordinator
+    def __init__(self, coordinator, config_entry, aircon_id, aircon):
+        super().__init__(coordinator)
         self._aircon_id = aircon_id
+        self._change_keys = (("aircons", aircon_id),)
         self._config_entry = config_entry
-        self._name = aircon_data.get("name", "Aircon")
+        self._name = aircon.name
         self._attr_unique_id = f"{config_entry.entry_id}_aircon_{aircon_id}_state"
         self._attr_name = f"{self._name}_state".replace(" ", "_").lower()
         self._attr_icon = "mdi:power"
@@ -158,16 +149,12 @@ class MyPlaceIQAirconStateSensor(SensorEntity):
     def state(self):
         """Return the on/off state of the AC."""
         data = self.coordinator.data
-        if not isinstance(data, dict) or not data or "body" not in data:
-            logger.debug("Invalid or missing coordinator data for aircon state: %s", data)
+        if data is None:
             return None
-        try:
-            body = json.loads(data["body"])
-            aircon = body.get("aircons", {}).get(self._aircon_id, {})
-            return "on" if aircon.get("isOn", False) else "off"
-        except (json.JSONDecodeError, TypeError) as err:
-            logger.error("Failed to parse coordinator data for aircon state: %s", err)
+        aircon = data.aircons.get(self._aircon_id)
+        if aircon is None:
             return None
+        return "on" if aircon.is_on else "off"
 
     @property
     def device_info(self):
@@ -179,18 +166,18 @@ class MyPlaceIQAirconStateSensor(SensorEntity):
             "model": "Aircon",
         }
 
-class MyPlaceIQZoneSensor(SensorEntity):
+class MyPlaceIQZoneSensor(MyPlaceIQEntity, SensorEntity):
     # pylint: disable=too-many-instance-attributes
     # pylint: disable=too-many-arguments, too-many-positional-arguments
     """Sensor for MyPlaceIQ zone temperature."""
 
-    def __init__(self, coordinator, config_entry, zone_id, zone_data, aircon_id):
-        super().__init__()
-        self.coordinator = coordinator
+    def __init__(self, coordinator, config_entry, zone_id, zone, aircon_id):
+        super().__init__(coordinator)
         self._zone_id = zone_id
         self._aircon_id = aircon_id
+        self._change_keys = (("zones", zone_id),)
         self._config_entry = config_entry
-        self._name = zone_data.get("name", "Zone")
+        self._name = zone.name
         self._attr_unique_id = f"{config_entry.entry_id}_zone_{zone_id}_temperature"
         self._attr_name = f"{self._name}_temperature".replace(" ", "_").lower()
         self._attr_icon = "mdi:thermostat"
@@ -202,62 +189,43 @@ class MyPlaceIQZoneSensor(SensorEntity):
     def state(self):
         """Return the current temperature of the zone."""
         data = self.coordinator.data
-        if not isinstance(data, dict) or not data or "body" not in data:
-            logger.debug("Invalid or missing coordinator data for zone state: %s", data)
-            return None
-        try:
-            body = json.loads(data["body"])
-            zone = body.get("zones", {}).get(self._zone_id, {})
-            return zone.get("temperatureSensorValue")
-        except (json.JSONDecodeError, TypeError) as err:
-            logger.error("Failed to parse coordinator data for zone state: %s", err)
+        if data is None:
             return None
+        zone = data.zones.get(self._zone_id)
+        return zone.temperature if zone is not None else None
 
     @property
     def extra_state_attributes(self):
-        """Return additional state attributes for the zone."""
+        """Return additional state attributes for the zone, built once per snapshot."""
         data = self.coordinator.data
-        if not isinstance(data, dict) or not data or "body" not in data:
-            logger.debug("Invalid or missing coordinator data for zone attributes: %s", data)
-            return {}
-        try:
-            body = json.loads(data["body"])
-            zone = body.get("zones", {}).get(self._zone_id, {})
-            return {
-                "is_on": zone.get("isOn", False),
-                "aircon_mode": zone.get("airconMode"),
-                "target_temperature_heat": zone.get("targetTemperatureHeat"),
-                "target_temperature_cool": zone.get("targetTemperatureCool"),
-                "zone_type": zone.get("zoneType"),
-                "is_clickable": zone.get("isClickable", False)
-            }
-        except (json.JSONDecodeError, TypeError) as err:
-            logger.error("Failed to parse coordinator data for zone attributes: %s", err)
+        if data is None:
             return {}
+        return data.attributes("zones", self._zone_id, _zone_attributes) or {}
 
     @property
     def device_info(self):
         """Return device information."""
+        aircon_id = self._parent_aircon_id(self._zone_id, self._aircon_id)
         return {
             "identifiers": {(DOMAIN, f"{self._config_entry.entry_id}_zone_{self._zone_id}")},
             "name": f"Zone {self._name}",
             "manufacturer": "MyPlaceIQ",
             "model": "Zone",
-            "via_device": (DOMAIN, f"{self._config_entry.entry_id}_aircon_{self._aircon_id}")
+            "via_device": (DOMAIN, f"{self._config_entry.entry_id}_aircon_{aircon_id}")
         }
 
-class MyPlaceIQZoneStateSensor(SensorEntity):
+class MyPlaceIQZoneStateSensor(MyPlaceIQEntity, SensorEntity):
     # pylint: disable=too-many-instance-attributes
     # pylint: disable=too-many-arguments, too-many-positional-arguments
     """Sensor for MyPlaceIQ zone on/off state."""
 
-    def __init__(self, coordinator, config_entry, zone_id, zone_data, aircon_id):
-        super().__init__()
-        self.coordinator = coordinator
+    def __init__(self, coordinator, config_entry, zone_id, zone, aircon_id):
+        super().__init__(coordinator)
         self._zone_id = zone_id
         self._aircon_id = aircon_id
+        self._change_keys = (("zones", zone_id),)
         self._config_entry = config_entry
-        self._name = zone_data.get("name", "Zone")
+        self._name = zone.name
         self._attr_unique_id = f"{config_entry.entry_id}_zone_{zone_id}_state"
         self._attr_name = f"{self._name}_state".replace(" ", "_").lower()
         self._attr_icon = "mdi:toggle-switch"
@@ -268,24 +236,90 @@ class MyPlaceIQZoneStateSensor(SensorEntity):
     def state(self):
         """Return the on/off state of the zone."""
         data = self.coordinator.data
-        if not isinstance(data, dict) or not data or "body" not in data:
-            logger.debug("Invalid or missing coordinator data for zone state: %s", data)
+        if data is None:
             return None
-        try:
-            body = json.loads(data["body"])
-            zone = body.get("zones", {}).get(self._zone_id, {})
-            return "on" if zone.get("isOn", False) else "off"
-        except (json.JSONDecodeError, TypeError) as err:
-            logger.error("Failed to parse coordinator data for zone state: %s", err)
+        zone = data.zones.get(self._zone_id)
+        if zone is None:
             return None
+        return "on" if zone.is_on else "off"
 
     @property
     def device_info(self):
         """Return device information."""
+        aircon_id = self._parent_aircon_id(self._zone_id, self._aircon_id)
         return {
             "identifiers": {(DOMAIN, f"{self._config_entry.entry_id}_zone_{self._zone_id}")},
             "name": f"Zone {self._name}",
             "manufacturer": "MyPlaceIQ",
             "model": "Zone",
-            "via_device": (DOMAIN, f"{self._config_entry.entry_id}_aircon_{self._aircon_id}")
+            "via_device": (DOMAIN, f"{self._config_entry.entry_id}_aircon_{aircon_id}")
+        }
+
+class MyPlaceIQMetricSensor(CoordinatorEntity, SensorEntity):
+    # pylint: disable=too-many-instance-attributes
+    """Diagnostic sensor exposing one of the hub's metrics."""
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+
+    def __init__(self, coordinator, config_entry, metric):
+        super().__init__(coordinator)
+        self._metric = metric
+        self._config_entry = config_entry
+        name, icon, unit = METRIC_SENSORS[metric]
+        self._attr_unique_id = f"{config_entry.entry_id}_hub_{name}"
+        # Named after the hub's host so several hubs' metrics stay apart
+        host = config_entry.data.get(CONF_HOST, config_entry.entry_id)
+        self._attr_name = f"myplaceiq_{host}_{name}".replace(".", "_").replace(" ", "_").lower()
+        self._attr_icon = icon
+        self._attr_native_unit_of_measurement = unit
+        self._is_histogram = metric in TIMING_METRICS or metric == ENTITY_WRITES_PER_UPDATE
+        self._attr_state_class = (
+            SensorStateClass.MEASUREMENT if self._is_histogram else
+            SensorStateClass.TOTAL_INCREASING
+        )
+
+    @property
+    def native_value(self):
+        """Return the counter, or the last value recorded in the histogram."""
+        metrics = self.coordinator.metrics
+        if not self._is_histogram:
+            return metrics.counter(self._metric)
+        histogram = metrics.histogram(self._metric)
+        if histogram is None:
+            return None
+        return self._scale(histogram.last)
+
+    @property
+    def extra_state_attributes(self):
+        """Return the histogram's summary."""
+        histogram = self.coordinator.metrics.histogram(self._metric) if self._is_histogram else None
+        if histogram is None:
+            return {}
+        return {
+            "count": histogram.count,
+            "mean": self._scale(histogram.mean),
+            "min": self._scale(histogram.minimum),
+            "max": self._scale(histogram.maximum),
+        }
+
+    @property
+    def available(self):
+        """Return True; metrics stay readable while the hub is unreachable."""
+        return True
+
+    def _scale(self, value):
+        """Return a histogram value in the sensor's unit (milliseconds for timings)."""
+        if value is None or self._metric not in TIMING_METRICS:
+            return value
+        return round(value * 1000, 2)
+
+    @property
+    def device_info(self):
+        """Return device information."""
+        return {
+            "identifiers": {(DOMAIN, f"{self._config_entry.entry_id}_hub")},
+            "name": self._config_entry.title or "MyPlaceIQ Hub",
+            "manufacturer": "MyPlaceIQ",
+            "model": "Hub",
         }
@@ -0,0 +1 @@
+"""Behaviour tests for the MyPlaceIQ integration."""
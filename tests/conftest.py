@@ -0,0 +1,133 @@
+"""Shared fixtures for the MyPlaceIQ behaviour tests.
+
+The tests drive the real client and coordinator against the local hub
+simulator. Run from the repository root with Home Assistant installed::
+
+    python -m pytest tests
+
+Tests may be ``async def``; they run to completion on the ``loop`` fixture,
+which every simulator-driven test already uses through ``simulator``.
+"""
+# pylint: disable=redefined-outer-name
+import inspect
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("homeassistant")
+
+# pylint: disable=wrong-import-position
+from homeassistant.config_entries import ConfigEntries, ConfigEntry
+from homeassistant.helpers import device_registry as dr, entity_registry as er
+from custom_components.myplaceiq import button, climate, myplaceiq, sensor
+from custom_components.myplaceiq.circuit_breaker import CircuitBreaker
+from custom_components.myplaceiq.const import (
+    CONF_CLIENT_ID, CONF_CLIENT_SECRET, CONF_HOST, CONF_PORT, DOMAIN
+)
+from tools.hub_simulator import HubSimulator
+from .fixtures import hass, loop # pylint: disable=unused-import
+
+PLATFORMS = (sensor, climate, button)
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_pyfunc_call(pyfuncitem):
+    """Run ``async def`` tests on the ``loop`` fixture."""
+    if not inspect.iscoroutinefunction(pyfuncitem.obj):
+        return None
+    # pylint: disable=protected-access
+    arguments = {name: pyfuncitem.funcargs[name] for name in pyfuncitem._fixtureinfo.argnames}
+    pyfuncitem.funcargs["loop"].run_until_complete(pyfuncitem.obj(**arguments))
+    return True
+
+@pytest.fixture(autouse=True)
+def fast_reconnect(monkeypatch):
+    """Retry failed connections without the production backoff delay."""
+    monkeypatch.setattr(myplaceiq, "RECONNECT_BACKOFF_BASE", 0)
+
+@pytest.fixture
+def simulator(loop):
+    """Return a function that starts a hub simulator, stopped after the test."""
+    started = []
+
+    async def start(port: int = 0, **kwargs) -> HubSimulator:
+        instance = HubSimulator(**kwargs)
+        await instance.start(port=port)
+        started.append(instance)
+        return instance
+
+    yield start
+    for instance in started:
+        loop.run_until_complete(instance.stop())
+
+@pytest.fixture
+def client(loop):
+    """Return a function creating a client for a simulator, closed after the test.
+
+    ``breaker`` options replace the client's circuit breaker, so tests can
+    use a short reset delay or a higher failure threshold.
+    """
+    clients = []
+
+    def create(hub: HubSimulator, hass=None, breaker=None, **kwargs) -> myplaceiq.MyPlaceIQ:
+        instance = myplaceiq.MyPlaceIQ(
+            hass, "127.0.0.1", hub.port, "test", "test", **kwargs)
+        if breaker is not None:
+            # pylint: disable=protected-access
+            instance._breaker = CircuitBreaker(f"127.0.0.1:{hub.port}", **breaker)
+        clients.append(instance)
+        return instance
+
+    yield create
+    for instance in clients:
+        loop.run_until_complete(instance.close())
+
+def add_config_entry(hass, host: str = "127.0.0.1", port: int = 8086) -> ConfigEntry:
+    """Register a config entry for a hub with Home Assistant without setting it up."""
+    if hass.config_entries is None:
+        hass.config_entries = ConfigEntries(hass, {})
+    entry = ConfigEntry(
+        version=1, minor_version=1, domain=DOMAIN, title=f"MyPlaceIQ {host}:{port}",
+        data={
+            CONF_HOST: host, CONF_PORT: port,
+            CONF_CLIENT_ID: "test", CONF_CLIENT_SECRET: "test",
+        },
+        source="user")
+    # How Home Assistant's own test helpers add an entry
+    hass.config_entries._entries[entry.entry_id] = entry # pylint: disable=protected-access
+    return entry
+
+@pytest.fixture
+def config_entry(hass, loop):
+    """Config entry known to Home Assistant, with the entity and device registries loaded."""
+    entry = add_config_entry(hass)
+    loop.run_until_complete(er.async_load(hass))
+    loop.run_until_complete(dr.async_load(hass))
+    return entry
+
+async def setup_platforms(hass, config_entry, coordinator):
+    """Set up every platform for the entry and return the entities created, now and later.
+
+    Entities are recorded in the entity and device registries as Home
+    Assistant's entity platform would, without writing their state.
+    """
+    hass.data[DOMAIN][config_entry.entry_id] = {"coordinator": coordinator}
+    entities = []
+
+    def add_entities_callback(domain):
+        def async_add_entities(new_entities):
+            for entity in new_entities:
+                device = dr.async_get(hass).async_get_or_create(
+                    config_entry_id=config_entry.entry_id, **entity.device_info)
+                er.async_get(hass).async_get_or_create(
+                    domain, DOMAIN, entity.unique_id, suggested_object_id=entity.name,
+                    config_entry=config_entry, device_id=device.id)
+                entities.append(entity)
+        return async_add_entities
+
+    for platform in PLATFORMS:
+        domain = platform.__name__.rsplit(".", 1)[-1]
+        await platform.async_setup_entry(hass, config_entry, add_entities_callback(domain))
+    return entities
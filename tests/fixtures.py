@@ -0,0 +1,24 @@
+"""Fixtures shared by the behaviour tests and the benchmarks."""
+import asyncio
+
+import pytest
+
+from homeassistant.core import HomeAssistant
+from custom_components.myplaceiq.const import DOMAIN
+
+@pytest.fixture
+def loop():
+    """Event loop Home Assistant, the simulator and coroutines run on."""
+    event_loop = asyncio.new_event_loop()
+    yield event_loop
+    event_loop.close()
+
+@pytest.fixture
+def hass(loop, tmp_path):
+    """Minimal Home Assistant instance."""
+    # pylint: disable=redefined-outer-name
+    async def create():
+        return HomeAssistant(str(tmp_path))
+    instance = loop.run_until_complete(create())
+    instance.data[DOMAIN] = {}
+    return instance
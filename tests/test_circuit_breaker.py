@@ -0,0 +1,44 @@
+"""Circuit breaker behaviour of the client against an unreachable hub."""
+import asyncio
+
+import pytest
+
+from custom_components.myplaceiq.circuit_breaker import CircuitOpenError
+
+COMMAND = {"commands": [{"__type": "GetFullDataEvent"}]}
+RESET_BASE = 0.05
+
+async def test_breaker_opens_probes_and_recovers(simulator, client):
+    """Requests fail fast once the hub is down, and one probe closes the circuit again."""
+    hub = await simulator()
+    port = hub.port
+    api = client(hub, breaker={"reset_base": RESET_BASE, "reset_max": RESET_BASE})
+    await api.send_command(COMMAND)
+    await hub.stop()
+
+    for _ in range(2):
+        with pytest.raises(OSError):
+            await api.send_command(COMMAND)
+    assert not api.available
+    with pytest.raises(CircuitOpenError):
+        await api.send_command(COMMAND)
+
+    # A failed probe opens the circuit again
+    await asyncio.sleep(RESET_BASE)
+    with pytest.raises(OSError):
+        await api.send_command(COMMAND)
+    with pytest.raises(CircuitOpenError):
+        await api.send_command(COMMAND)
+
+    hub = await simulator(port=port, latency=0.1)
+    await asyncio.sleep(RESET_BASE)
+    probe = asyncio.create_task(api.send_command(COMMAND))
+    await asyncio.sleep(0.02)
+    # Only the probe is let through while the circuit is half-open
+    with pytest.raises(CircuitOpenError):
+        await api.send_command(COMMAND)
+    assert hub.stats == {"GetFullDataEvent": 1}
+    await probe
+    assert api.available
+    await api.send_command(COMMAND)
+    assert hub.stats == {"GetFullDataEvent": 2}
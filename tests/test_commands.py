@@ -0,0 +1,67 @@
+"""Batching and coalescing of commands queued by many entities."""
+import asyncio
+
+import pytest
+
+from custom_components.myplaceiq.commands import MyPlaceIQCommandQueue
+
+WINDOW = 0.05
+
+def zone_command(zone_id: str, is_open: bool) -> dict:
+    """Return a SetZoneOpenClose command."""
+    return {"__type": "SetZoneOpenClose", "zoneId": zone_id, "isOpen": is_open}
+
+async def test_commands_coalesced_into_one_request(simulator, client):
+    """Commands queued together reach the hub as one request, last intent per zone."""
+    hub = await simulator(reply_state=True)
+    batches = []
+    queue = MyPlaceIQCommandQueue(
+        client(hub).send_command,
+        on_batch_sent=lambda commands, response: batches.append(commands),
+        window=WINDOW)
+    responses = await asyncio.gather(
+        queue.async_send([zone_command("z1", False)]),
+        queue.async_send([zone_command("z2", False)]),
+        queue.async_send([zone_command("z1", True)]),
+    )
+    assert batches == [[zone_command("z2", False), zone_command("z1", True)]]
+    assert hub.stats == {"SetZoneOpenClose": 2}
+    assert hub.state["zones"]["z1"]["isOn"] is True
+    assert hub.state["zones"]["z2"]["isOn"] is False
+    # Every caller shares the batch's response
+    assert all(response is responses[0] for response in responses)
+    assert set(responses[0]["body"]["zones"]) == {"z1", "z2"}
+
+async def test_batch_failure_reaches_every_caller(simulator, client):
+    """A batch the hub never answers fails for each caller that joined it."""
+    hub = await simulator(drop_rate=1)
+    queue = MyPlaceIQCommandQueue(
+        client(hub, command_timeout=0.1).send_command, window=WINDOW)
+    results = await asyncio.gather(
+        queue.async_send([zone_command("z1", False)]),
+        queue.async_send([zone_command("z2", False)]),
+        return_exceptions=True)
+    assert all(isinstance(result, TimeoutError) for result in results)
+
+async def test_later_commands_start_a_new_batch(simulator, client):
+    """Commands queued after a batch was sent go out in a batch of their own."""
+    hub = await simulator()
+    queue = MyPlaceIQCommandQueue(client(hub).send_command, window=WINDOW)
+    await queue.async_send([zone_command("z1", False)])
+    await queue.async_send([zone_command("z1", True)])
+    assert hub.stats == {"SetZoneOpenClose": 2}
+    assert hub.state["zones"]["z1"]["isOn"] is True
+
+@pytest.mark.parametrize("pending", [0, 2])
+async def test_flush_sends_queued_commands_now(simulator, client, pending):
+    """``async_flush`` sends what is queued without waiting out the window."""
+    hub = await simulator()
+    queue = MyPlaceIQCommandQueue(client(hub).send_command, window=60)
+    senders = [
+        asyncio.create_task(queue.async_send([zone_command(f"z{index + 1}", False)]))
+        for index in range(pending)
+    ]
+    await asyncio.sleep(0)
+    await asyncio.wait_for(queue.async_flush(), 1)
+    await asyncio.gather(*senders)
+    assert sum(hub.stats.values()) == pending
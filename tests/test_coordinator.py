@@ -0,0 +1,131 @@
+"""Refreshes, polling and state updates of the data update coordinator."""
+import asyncio
+import logging
+
+from homeassistant.const import EVENT_HOMEASSISTANT_FINAL_WRITE
+
+from custom_components.myplaceiq import async_update_options
+from custom_components.myplaceiq.const import (
+    CONF_IDLE_POLL_INTERVAL, CONF_POLL_INTERVAL, CONF_PORT, CONF_PUSH_UPDATES, DOMAIN
+)
+from custom_components.myplaceiq.coordinator import (
+    MyPlaceIQDataUpdateCoordinator, snapshot_store
+)
+from .conftest import setup_platforms
+
+# Poll intervals in seconds while active and idle
+ACTIVE = 30
+IDLE = 300
+
+async def test_invalid_body_logged_once(hass, simulator, client, caplog):
+    """Repeated invalid replies leave one error, from the coordinator going unavailable."""
+    hub = await simulator()
+    coordinator = MyPlaceIQDataUpdateCoordinator(hass, client(hub, hass), update_interval=60)
+    hub.state = {"ack": True}
+    with caplog.at_level(logging.DEBUG):
+        for _ in range(3):
+            await coordinator.async_refresh()
+    assert not coordinator.last_update_success
+    errors = [record for record in caplog.records if record.levelno >= logging.ERROR]
+    assert len(errors) == 1
+    assert "Invalid response from MyPlaceIQ: <uuid=" in errors[0].getMessage()
+    await coordinator.async_shutdown()
+
+async def started(hass, hub, client, **kwargs) -> MyPlaceIQDataUpdateCoordinator:
+    """Return a coordinator for ``hub`` after its first refresh."""
+    coordinator = MyPlaceIQDataUpdateCoordinator(
+        hass, client(hub, hass), update_interval=ACTIVE, idle_interval=IDLE, **kwargs)
+    await coordinator.async_refresh()
+    assert coordinator.last_update_success
+    return coordinator
+
+async def test_pushed_event_applied_without_polling(hass, simulator, client):
+    """A pushed change updates the data at once, and only the changed zone is stale."""
+    hub = await simulator()
+    coordinator = await started(hass, hub, client)
+    coordinator.async_set_push_updates(True)
+    assert coordinator.poll_interval == IDLE
+    hub.state["zones"]["z1"]["temperatureSensorValue"] = 30.5
+    await hub.push({"zones": {"z1": hub.state["zones"]["z1"]}})
+    await asyncio.sleep(0.05)
+    assert coordinator.data.zones["z1"].temperature == 30.5
+    assert coordinator.changed_keys == {("zones", "z1")}
+    assert hub.stats == {"GetFullDataEvent": 1}
+
+    coordinator.async_set_push_updates(False)
+    await hub.push({"zones": {"z1": {"temperatureSensorValue": 10}}})
+    await asyncio.sleep(0.05)
+    assert coordinator.data.zones["z1"].temperature == 30.5
+    await coordinator.async_shutdown()
+
+async def test_interval_follows_activity(hass, simulator, client):
+    """Polling is fast while an aircon runs or after a command, and slow otherwise."""
+    hub = await simulator()
+    coordinator = await started(hass, hub, client)
+    # The first aircon of a simulated hub is on
+    assert coordinator.poll_interval == ACTIVE
+    hub.state["aircons"]["a1"]["isOn"] = False
+    await coordinator.async_refresh()
+    assert coordinator.poll_interval == IDLE
+    assert coordinator.update_interval.total_seconds() == IDLE
+
+    await coordinator.async_send_commands(
+        [{"__type": "SetZoneOpenClose", "zoneId": "z1", "isOpen": True}])
+    assert coordinator.poll_interval == ACTIVE
+
+    await hub.stop()
+    await coordinator.async_refresh()
+    assert not coordinator.last_update_success
+    assert coordinator.poll_interval == IDLE
+    await coordinator.async_shutdown()
+
+async def test_options_applied_in_place(hass, simulator, client, config_entry):
+    """New options retune polling, enable push and switch hubs without a reload."""
+    hub = await simulator()
+    coordinator = await started(hass, hub, client)
+    api = coordinator.myplaceiq
+    hass.data[DOMAIN][config_entry.entry_id] = {"coordinator": coordinator, "myplaceiq": api}
+    other = await simulator(zones=6)
+    hass.config_entries.async_update_entry(
+        config_entry,
+        data={**config_entry.data, CONF_PORT: other.port},
+        options={CONF_POLL_INTERVAL: 20, CONF_IDLE_POLL_INTERVAL: 600, CONF_PUSH_UPDATES: True})
+
+    await async_update_options(hass, config_entry)
+    await hass.async_block_till_done()
+    assert (coordinator.active_interval, coordinator.idle_interval) == (20, 600)
+    assert coordinator.push_updates and coordinator.poll_interval == 600
+    assert len(coordinator.data.zones) == 6
+    assert other.stats == {"GetFullDataEvent": 1}
+    # Still the same coordinator and client, now listening for the new hub's events
+    assert hass.data[DOMAIN][config_entry.entry_id]["myplaceiq"] is api
+    other.state["zones"]["z6"]["isOn"] = True
+    await other.push({"zones": {"z6": other.state["zones"]["z6"]}})
+    await asyncio.sleep(0.05)
+    assert coordinator.data.zones["z6"].is_on
+    await coordinator.async_shutdown()
+
+async def test_cached_snapshot_restored_while_hub_unreachable(
+        hass, simulator, client, config_entry):
+    """The last saved state populates a new coordinator before the hub answers."""
+    hub = await simulator()
+    store = snapshot_store(hass, config_entry.entry_id)
+    coordinator = await started(hass, hub, client, store=store)
+    hass.bus.async_fire(EVENT_HOMEASSISTANT_FINAL_WRITE)
+    await hass.async_block_till_done()
+    saved = coordinator.hub_data
+    await coordinator.async_shutdown()
+    await hub.stop()
+
+    restarted = MyPlaceIQDataUpdateCoordinator(
+        hass, client(hub, hass), update_interval=ACTIVE, idle_interval=IDLE,
+        store=snapshot_store(hass, config_entry.entry_id))
+    assert await restarted.async_restore_snapshot()
+    assert restarted.data == saved
+    entities = await setup_platforms(hass, config_entry, restarted)
+    assert len(entities) > len(saved.zones)
+    # A failed refresh leaves the restored state in place, shown unavailable
+    await restarted.async_refresh()
+    assert not restarted.last_update_success
+    assert restarted.data == saved
+    await restarted.async_shutdown()
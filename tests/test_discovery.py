@@ -0,0 +1,130 @@
+"""Entities added and removed as aircons and zones come and go on the hub."""
+from homeassistant.helpers import device_registry as dr, entity_registry as er
+
+from custom_components.myplaceiq.const import DOMAIN
+from custom_components.myplaceiq.coordinator import (
+    ENTITY_REMOVAL_REFRESHES, MyPlaceIQDataUpdateCoordinator
+)
+from .conftest import setup_platforms
+
+async def start(hass, simulator, client, config_entry):
+    """Return a hub, its refreshed coordinator and the entities set up for it."""
+    hub = await simulator(zones=4)
+    coordinator = MyPlaceIQDataUpdateCoordinator(hass, client(hub, hass), update_interval=60)
+    await coordinator.async_refresh()
+    entities = await setup_platforms(hass, config_entry, coordinator)
+    return hub, coordinator, entities
+
+async def refresh(coordinator, times=1):
+    """Fetch the full state ``times`` times."""
+    for _ in range(times):
+        await coordinator.async_refresh()
+        assert coordinator.last_update_success
+
+def zone_entity_ids(hass, zone_id):
+    """Return the registry entity IDs of a zone's entities."""
+    registry = er.async_get(hass)
+    return sorted(
+        entry.entity_id for entry in registry.entities.values()
+        if f"_zone_{zone_id}_" in entry.unique_id)
+
+def zone_device(hass, config_entry, zone_id):
+    """Return a zone's device, or None if it is not registered."""
+    return dr.async_get(hass).async_get_device(
+        identifiers={(DOMAIN, f"{config_entry.entry_id}_zone_{zone_id}")})
+
+def remove_zone(hub, zone_id):
+    """Delete a zone from the simulated hub and return its state."""
+    for aircon in hub.state["aircons"].values():
+        if zone_id in aircon["zoneOrder"]:
+            aircon["zoneOrder"].remove(zone_id)
+    return hub.state["zones"].pop(zone_id)
+
+def restore_zone(hub, zone_id, zone):
+    """Put a removed zone back on the first aircon of the simulated hub."""
+    hub.state["zones"][zone_id] = zone
+    hub.state["aircons"]["a1"]["zoneOrder"].append(zone_id)
+
+async def test_missing_zone_removed_after_repeated_absences(
+        hass, simulator, client, config_entry):
+    """A zone gone from the hub loses its entities and device after the last absence."""
+    hub, coordinator, entities = await start(hass, simulator, client, config_entry)
+    entity_ids = zone_entity_ids(hass, "z4")
+    assert entity_ids
+    assert zone_device(hass, config_entry, "z4") is not None
+    remove_zone(hub, "z4")
+
+    await refresh(coordinator, ENTITY_REMOVAL_REFRESHES - 1)
+    assert zone_entity_ids(hass, "z4") == entity_ids
+    assert not any(
+        entity.available for entity in entities if "_zone_z4_" in entity.unique_id)
+
+    await refresh(coordinator)
+    assert not zone_entity_ids(hass, "z4")
+    assert zone_device(hass, config_entry, "z4") is None
+    # Other zones are untouched
+    assert zone_entity_ids(hass, "z3")
+    await coordinator.async_shutdown()
+
+async def test_hidden_zone_kept_unavailable(hass, simulator, client, config_entry):
+    """Hiding a zone keeps its entities and customisations, shown unavailable."""
+    hub, coordinator, entities = await start(hass, simulator, client, config_entry)
+    entity_ids = zone_entity_ids(hass, "z2")
+    registry = er.async_get(hass)
+    registry.async_update_entity(entity_ids[0], name="Study")
+    zone_entities = [entity for entity in entities if "_zone_z2_" in entity.unique_id]
+    hub.state["zones"]["z2"]["isVisible"] = False
+
+    await refresh(coordinator, ENTITY_REMOVAL_REFRESHES + 1)
+    assert zone_entity_ids(hass, "z2") == entity_ids
+    assert registry.async_get(entity_ids[0]).name == "Study"
+    assert zone_device(hass, config_entry, "z2") is not None
+    assert not any(entity.available for entity in zone_entities)
+
+    hub.state["zones"]["z2"]["isVisible"] = True
+    count = len(entities)
+    await refresh(coordinator)
+    assert all(entity.available for entity in zone_entities)
+    assert len(entities) == count
+    await coordinator.async_shutdown()
+
+async def test_zone_returning_resets_removal(hass, simulator, client, config_entry):
+    """A zone back before the last absence keeps its entities, and its count starts over."""
+    hub, coordinator, entities = await start(hass, simulator, client, config_entry)
+    entity_ids = zone_entity_ids(hass, "z4")
+    zone_entities = [entity for entity in entities if "_zone_z4_" in entity.unique_id]
+    zone = remove_zone(hub, "z4")
+    await refresh(coordinator, ENTITY_REMOVAL_REFRESHES - 1)
+
+    restore_zone(hub, "z4", zone)
+    count = len(entities)
+    await refresh(coordinator)
+    assert zone_entity_ids(hass, "z4") == entity_ids
+    assert all(entity.available for entity in zone_entities)
+    assert len(entities) == count
+
+    remove_zone(hub, "z4")
+    await refresh(coordinator, ENTITY_REMOVAL_REFRESHES - 1)
+    assert zone_entity_ids(hass, "z4") == entity_ids
+    await coordinator.async_shutdown()
+
+async def test_new_and_revealed_zones_get_entities(hass, simulator, client, config_entry):
+    """Zones added to the hub or made visible get entities on the next update."""
+    hub, coordinator, entities = await start(hass, simulator, client, config_entry)
+    zone = dict(hub.state["zones"]["z1"], name="Zone 5")
+    restore_zone(hub, "z5", zone)
+    hub.state["zones"]["z5"]["isVisible"] = False
+    await refresh(coordinator)
+    assert not zone_entity_ids(hass, "z5")
+
+    hub.state["zones"]["z5"]["isVisible"] = True
+    count = len(entities)
+    await refresh(coordinator)
+    # Temperature and state sensors, a climate entity and a toggle button
+    assert len(entities) == count + 4
+    assert len(zone_entity_ids(hass, "z5")) == 4
+    assert zone_device(hass, config_entry, "z5") is not None
+    # Nothing is added twice
+    await refresh(coordinator)
+    assert len(entities) == count + 4
+    await coordinator.async_shutdown()
@@ -0,0 +1,68 @@
+"""Limits shared by every hub on one Home Assistant instance."""
+import asyncio
+
+from homeassistant.const import EVENT_HOMEASSISTANT_CLOSE
+
+from custom_components.myplaceiq.coordinator import MyPlaceIQDataUpdateCoordinator
+from custom_components.myplaceiq.hub_manager import MAX_CONCURRENT_REQUESTS, MyPlaceIQHubManager
+from custom_components.myplaceiq.myplaceiq import MyPlaceIQ
+from tools.hub_simulator import HubSimulator
+
+HUBS = 3
+COMMANDS_PER_HUB = 8
+
+class CountingSimulator(HubSimulator):
+    """Simulator counting requests awaiting a reply across every instance."""
+
+    in_flight = 0
+    peak = 0
+
+    async def _handle_message(self, ws, data):
+        """Count the request while its reply is pending."""
+        CountingSimulator.in_flight += 1
+        CountingSimulator.peak = max(CountingSimulator.peak, CountingSimulator.in_flight)
+        try:
+            await super()._handle_message(ws, data)
+        finally:
+            CountingSimulator.in_flight -= 1
+
+async def test_request_limit_spans_hubs(client):
+    """Hubs sharing a limit never have more than ``MAX_CONCURRENT_REQUESTS`` requests in flight."""
+    CountingSimulator.in_flight = CountingSimulator.peak = 0
+    hubs = [CountingSimulator(latency=0.05) for _ in range(HUBS)]
+    limit = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    apis = []
+    for hub in hubs:
+        await hub.start()
+        apis.append(client(hub, request_limit=limit))
+    command = {"commands": [{"__type": "GetFullDataEvent"}]}
+    try:
+        await asyncio.gather(
+            *(api.send_command(command) for api in apis for _ in range(COMMANDS_PER_HUB)))
+    finally:
+        for hub in hubs:
+            await hub.stop()
+    assert CountingSimulator.peak == MAX_CONCURRENT_REQUESTS
+    assert sum(sum(hub.stats.values()) for hub in hubs) == HUBS * COMMANDS_PER_HUB
+
+async def test_polls_staggered_across_hubs(hass):
+    """Hubs poll at evenly spaced phases of the interval, respaced when one is removed."""
+    manager = MyPlaceIQHubManager(hass)
+    coordinators = {}
+    for entry_id in ("a", "b", "c"):
+        coordinators[entry_id] = MyPlaceIQDataUpdateCoordinator(
+            hass, MyPlaceIQ(hass, "127.0.0.1", 8086, "test", "test"), update_interval=60)
+        manager.async_add_hub(entry_id, coordinators[entry_id])
+    assert [coordinator.poll_phase for coordinator in coordinators.values()] == [0, 1 / 3, 2 / 3]
+    for coordinator in coordinators.values():
+        # Unrefreshed hubs poll at the idle interval, shifted onto their phase
+        interval = coordinator.poll_interval
+        delay = coordinator.update_interval.total_seconds()
+        offset = (hass.loop.time() + delay - coordinator.poll_phase * interval) % interval
+        assert min(offset, interval - offset) < 0.1
+        assert interval / 2 <= delay <= interval * 1.5
+
+    manager.async_remove_hub("b")
+    assert (coordinators["a"].poll_phase, coordinators["c"].poll_phase) == (0, 1 / 2)
+    hass.bus.async_fire(EVENT_HOMEASSISTANT_CLOSE)
+    await hass.async_block_till_done()
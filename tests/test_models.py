@@ -0,0 +1,45 @@
+"""Snapshot parsing, merging and diffing."""
+from custom_components.myplaceiq.models import MyPlaceIQSnapshot
+from tools.hub_simulator import build_state
+
+def snapshot(zones: int = 4) -> MyPlaceIQSnapshot:
+    """Return a snapshot of a simulated hub's full state."""
+    return MyPlaceIQSnapshot.from_body(build_state(zones=zones))
+
+def test_merge_rebuilds_only_changed_items():
+    """Merged changes replace the named items and share every other one."""
+    before = snapshot()
+    after = before.merge({"zones": {"z1": {"temperatureSensorValue": 30.5}}})
+    assert after.zones["z1"].temperature == 30.5
+    assert after.zones["z1"].name == before.zones["z1"].name
+    assert after.zones["z2"] is before.zones["z2"]
+    assert after.aircons is before.aircons
+    assert before.zones["z1"].temperature != 30.5
+
+def test_merge_adds_new_items_and_skips_malformed():
+    """Unknown IDs become new items; entries that are not objects are ignored."""
+    before = snapshot()
+    after = before.merge({"zones": {"z9": {"name": "Attic", "isVisible": True}, "z1": None}})
+    assert after.zones["z9"].name == "Attic"
+    assert after.zones["z1"] is before.zones["z1"]
+
+def test_diff_reports_changed_added_and_removed():
+    """Diff names items whose fields changed, appeared or disappeared."""
+    before = snapshot()
+    changed = before.merge({"zones": {"z1": {"isOn": not before.zones["z1"].is_on}}})
+    assert changed.diff(before) == {("zones", "z1")}
+    body = build_state(zones=4)
+    del body["zones"]["z4"]
+    body["aircons"]["a1"]["zoneOrder"].remove("z4")
+    assert ("zones", "z4") in MyPlaceIQSnapshot.from_body(body).diff(before)
+    assert before.diff(None) == {("aircons", "a1")} | {("zones", f"z{i}") for i in range(1, 5)}
+
+def test_diff_ignores_equal_reparsed_items():
+    """A reparsed but unchanged state diffs as unchanged."""
+    body = build_state(zones=4)
+    assert not MyPlaceIQSnapshot.from_body(body).diff(MyPlaceIQSnapshot.from_body(body))
+
+def test_stored_snapshot_round_trips():
+    """``as_dict`` and ``from_dict`` rebuild an equal snapshot for the cache."""
+    before = snapshot()
+    assert MyPlaceIQSnapshot.from_dict(before.as_dict()) == before
@@ -0,0 +1,45 @@
+"""Optimistic changes shown while commands are in flight, and their rollback."""
+import asyncio
+
+import pytest
+
+from custom_components.myplaceiq.coordinator import MyPlaceIQDataUpdateCoordinator
+from custom_components.myplaceiq.metrics import OPTIMISTIC_ROLLBACKS
+
+COMMANDS = [{"__type": "SetZoneOpenClose", "zoneId": "z1", "isOpen": False}]
+OPTIMISTIC = {("zones", "z1"): {"is_on": False}}
+
+async def refreshed_coordinator(hass, api) -> MyPlaceIQDataUpdateCoordinator:
+    """Return a coordinator holding the hub's full state."""
+    coordinator = MyPlaceIQDataUpdateCoordinator(hass, api, update_interval=60)
+    await coordinator.async_refresh()
+    assert coordinator.last_update_success
+    return coordinator
+
+async def test_failed_command_rolls_back(hass, simulator, client):
+    """The optimistic value is shown in flight and withdrawn when the command fails."""
+    hub = await simulator()
+    coordinator = await refreshed_coordinator(hass, client(hub, hass, command_timeout=0.1))
+    assert coordinator.data.zones["z1"].is_on
+    hub.drop_rate = 1
+    sender = asyncio.create_task(coordinator.async_send_commands(COMMANDS, OPTIMISTIC))
+    await asyncio.sleep(0)
+    assert not coordinator.data.zones["z1"].is_on
+    with pytest.raises(TimeoutError):
+        await sender
+    assert coordinator.data.zones["z1"].is_on
+    assert coordinator.data == coordinator.hub_data
+    assert coordinator.metrics.counter(OPTIMISTIC_ROLLBACKS) == 1
+    await coordinator.async_shutdown()
+
+async def test_acknowledged_command_keeps_change(hass, simulator, client):
+    """An acknowledged change stays shown until hub state confirms it."""
+    hub = await simulator()
+    coordinator = await refreshed_coordinator(hass, client(hub, hass))
+    await coordinator.async_send_commands(COMMANDS, OPTIMISTIC)
+    assert not coordinator.data.zones["z1"].is_on
+    await coordinator.async_refresh()
+    assert not coordinator.hub_data.zones["z1"].is_on
+    assert not coordinator.overlay
+    assert coordinator.metrics.counter(OPTIMISTIC_ROLLBACKS) == 0
+    await coordinator.async_shutdown()
@@ -0,0 +1,25 @@
+"""Sensors created for a hub, including its diagnostic metric sensors."""
+from homeassistant.helpers import device_registry as dr, entity_registry as er
+
+from custom_components.myplaceiq.const import DOMAIN
+from custom_components.myplaceiq.coordinator import MyPlaceIQDataUpdateCoordinator
+from .conftest import add_config_entry, setup_platforms
+
+async def test_metric_sensors_distinct_per_hub(hass, simulator, client, config_entry):
+    """Each hub's metric sensors and hub device are named after that hub."""
+    entries = [config_entry, add_config_entry(hass, "192.168.1.20")]
+    for entry in entries:
+        hub = await simulator()
+        coordinator = MyPlaceIQDataUpdateCoordinator(hass, client(hub, hass), update_interval=60)
+        await coordinator.async_refresh()
+        await setup_platforms(hass, entry, coordinator)
+    metric_ids = [
+        entry.entity_id for entry in er.async_get(hass).entities.values()
+        if "_hub_" in entry.unique_id and entry.unique_id.endswith("_hub_connects")]
+    assert sorted(metric_ids) == [
+        "sensor.myplaceiq_127_0_0_1_connects", "sensor.myplaceiq_192_168_1_20_connects"]
+    devices = dr.async_get(hass)
+    assert sorted(
+        devices.async_get_device(identifiers={(DOMAIN, f"{entry.entry_id}_hub")}).name
+        for entry in entries
+    ) == ["MyPlaceIQ 127.0.0.1:8086", "MyPlaceIQ 192.168.1.20:8086"]
@@ -0,0 +1,86 @@
+"""Request routing and abandoned requests on the shared WebSocket."""
+# pylint: disable=protected-access
+import asyncio
+import logging
+
+import pytest
+
+from custom_components.myplaceiq.metrics import CONNECTS, RECONNECTS
+from custom_components.myplaceiq.myplaceiq import MAX_PENDING_REQUESTS
+
+def zone_command(zone_id: str, is_open: bool) -> dict:
+    """Return a command opening or closing one zone."""
+    return {"commands": [{"__type": "SetZoneOpenClose", "zoneId": zone_id, "isOpen": is_open}]}
+
+async def test_concurrent_replies_routed_by_uuid(simulator, client):
+    """Replies arriving out of order each reach the command they answer."""
+    hub = await simulator(zones=16, jitter=0.05, reply_state=True)
+    api = client(hub)
+    zone_ids = list(hub.state["zones"])
+    responses = await asyncio.gather(
+        *(api.send_command(zone_command(zone_id, False)) for zone_id in zone_ids))
+    for zone_id, response in zip(zone_ids, responses):
+        assert list(response["body"]["zones"]) == [zone_id]
+    # Every command shared the one socket
+    assert api.metrics.counter(CONNECTS) == 1
+    assert api.echoes_uuid
+    assert not api._pending
+
+async def test_late_reply_to_abandoned_request_is_dropped(simulator, client):
+    """A reply after the timeout is neither delivered nor taken for an event."""
+    hub = await simulator(latency=0.2)
+    api = client(hub, command_timeout=0.05)
+    events = []
+    api.async_add_event_listener(events.append)
+    with pytest.raises(TimeoutError):
+        await api.send_command(zone_command("z1", True))
+    assert list(api._pending.values()) == [None]
+    await asyncio.sleep(0.3)
+    assert not api._pending
+    assert not events
+    # The socket is still usable, and events still reach listeners
+    await hub.push({"zones": {"z1": hub.state["zones"]["z1"]}})
+    await asyncio.sleep(0.05)
+    assert len(events) == 1
+    assert api.connected
+
+async def test_stalled_hub_connection_is_dropped(simulator, client):
+    """A full window of unanswered requests closes the socket; the next command reconnects."""
+    hub = await simulator(drop_rate=1)
+    api = client(hub, command_timeout=0.1, breaker={"failure_threshold": 100})
+    results = await asyncio.gather(
+        *(api.send_command(zone_command("z1", True)) for _ in range(MAX_PENDING_REQUESTS)),
+        return_exceptions=True)
+    assert all(isinstance(result, TimeoutError) for result in results)
+    await asyncio.sleep(0.05)
+    assert not api.connected
+    hub.drop_rate = 0
+    await api.send_command(zone_command("z1", True))
+    assert api.metrics.counter(RECONNECTS) == 1
+
+async def test_uuid_less_replies_answer_commands_with_push_on(simulator, client, caplog):
+    """On a hub that echoes no uuid, replies still reach commands while events are listened for."""
+    hub = await simulator(echo_uuid=False, latency=0.02, reply_state=True)
+    api = client(hub)
+    events = []
+    api.async_add_event_listener(events.append)
+    responses = await asyncio.gather(
+        *(api.send_command(zone_command(zone_id, False)) for zone_id in ("z1", "z2", "z3")))
+    assert [list(response["body"]["zones"]) for response in responses] == [["z1"], ["z2"], ["z3"]]
+    assert api.echoes_uuid is False
+    assert "does not echo request uuids" in caplog.text
+    assert not events
+    # With nothing pending a frame without a uuid is an event
+    await hub.push({"zones": {"z1": hub.state["zones"]["z1"]}})
+    await asyncio.sleep(0.05)
+    assert len(events) == 1
+
+async def test_no_uuid_warning_when_push_enabled_later(simulator, client, caplog):
+    """The warning is also given when a listener is added after uuid-less replies were seen."""
+    hub = await simulator(echo_uuid=False)
+    api = client(hub)
+    await api.send_command(zone_command("z1", True))
+    assert api.echoes_uuid is False
+    with caplog.at_level(logging.WARNING):
+        api.async_add_event_listener(lambda frame: None)
+    assert "does not echo request uuids" in caplog.text
@@ -0,0 +1,302 @@
+"""Local MyPlaceIQ hub simulator for load, latency and transport testing.
+
+Speaks the hub's WebSocket envelope: each request is ``{"uuid", "body"}``
+with ``body`` a JSON-encoded ``{"commands": [...]}``, and each reply echoes the
+``uuid`` with a JSON-encoded ``body``. ``GetFullDataEvent`` returns the whole
+state; other commands are applied to it.
+
+Run it and point the integration at it::
+
+    python -m tools.hub_simulator --port 8086 --aircons 2 --zones 8 \\
+        --latency 0.05 --jitter 0.02 --drop-rate 0.01 --push-interval 5
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import uuid
+from typing import Any, Dict, List, Optional, Set
+
+from aiohttp import WSMsgType, web
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORT = 8086
+
+def build_state(aircons: int = 1, zones: int = 4) -> Dict[str, Any]:
+    """Return a full-state document with ``zones`` zones spread over ``aircons`` aircons."""
+    state: Dict[str, Any] = {"aircons": {}, "zones": {}}
+    for index in range(zones):
+        zone_id = f"z{index + 1}"
+        state["zones"][zone_id] = {
+            "name": f"Zone {index + 1}",
+            "isOn": index % 2 == 0,
+            "isVisible": True,
+            "isClickable": True,
+            "temperatureSensorValue": round(random.uniform(17, 25), 1),
+            "targetTemperatureHeat": 21,
+            "targetTemperatureCool": 24,
+            "zoneType": "common",
+        }
+    for index in range(aircons):
+        aircon_id = f"a{index + 1}"
+        state["aircons"][aircon_id] = {
+            "name": f"Aircon {index + 1}",
+            "isOn": index == 0,
+            "mode": "heat",
+            "actualTemperature": 21,
+            "targetTemperatureHeat": 22,
+            "targetTemperatureCool": 24,
+            "fanSpeedHeat": "auto",
+            "allowedModes": ["heat", "cool", "dry", "fan"],
+            "airconState": "running",
+            "zoneOrder": [
+                zone_id for zone_index, zone_id in enumerate(state["zones"])
+                if zone_index % aircons == index
+            ],
+        }
+    return state
+
+class HubSimulator:
+    """aiohttp WebSocket server that behaves like a MyPlaceIQ hub.
+
+    ``latency`` and ``jitter`` delay every reply, ``connect_latency`` delays
+    every WebSocket handshake, ``drop_rate`` is the chance a request gets no
+    reply at all, ``disconnect_rate`` the chance the socket is closed instead
+    of replying, and ``push_interval`` (seconds) emits a
+    temperature change event to every client. With ``reply_state`` command
+    replies carry the aircons and zones they changed; otherwise they are empty.
+    Without ``echo_uuid`` replies and events carry no ``uuid``.
+    """
+    # pylint: disable=too-many-instance-attributes
+    # pylint: disable=too-many-arguments, too-many-positional-arguments
+
+    def __init__(
+        self,
+        aircons: int = 1,
+        zones: int = 4,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        drop_rate: float = 0.0,
+        disconnect_rate: float = 0.0,
+        push_interval: Optional[float] = None,
+        reply_state: bool = False,
+        connect_latency: float = 0.0,
+        client_id: Optional[str] = None,
+        client_secret: Optional[str] = None,
+        echo_uuid: bool = True,
+    ) -> None:
+        """Initialize the simulator with generated state."""
+        self.state = build_state(aircons, zones)
+        self.latency = latency
+        self.jitter = jitter
+        self.drop_rate = drop_rate
+        self.disconnect_rate = disconnect_rate
+        self.push_interval = push_interval
+        self.reply_state = reply_state
+        self.connect_latency = connect_latency
+        self.echo_uuid = echo_uuid
+        self._credentials = (client_id, client_secret) if client_id is not None else None
+        self.clients: Set[web.WebSocketResponse] = set()
+        # Requests received per command type
+        self.stats: Dict[str, int] = {}
+        self._runner: Optional[web.AppRunner] = None
+        self._push_task: Optional[asyncio.Task] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self.port: Optional[int] = None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> int:
+        """Start serving on ``host``/``port`` (0 picks a free port); return the port."""
+        app = web.Application()
+        app.router.add_get("/ws", self._handle_socket)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        if self.push_interval:
+            self._push_task = asyncio.create_task(self._push_loop())
+        logger.info("MyPlaceIQ hub simulator listening on ws://%s:%s/ws", host, self.port)
+        return self.port
+
+    async def stop(self) -> None:
+        """Close every client socket and stop the server."""
+        if self._push_task is not None:
+            self._push_task.cancel()
+        for task in list(self._tasks):
+            task.cancel()
+        for ws in list(self.clients):
+            await ws.close()
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def push(self, changes: Dict[str, Any]) -> None:
+        """Send an unsolicited state-change event to every connected client."""
+        frame = self._frame(str(uuid.uuid4()), changes)
+        for ws in list(self.clients):
+            if not ws.closed:
+                await ws.send_str(frame)
+
+    async def _handle_socket(self, request: web.Request) -> web.WebSocketResponse:
+        """Serve one client connection."""
+        if self._credentials is not None and (
+                request.headers.get("client_id"), request.headers.get("password")
+        ) != self._credentials:
+            raise web.HTTPUnauthorized()
+        if self.connect_latency:
+            await asyncio.sleep(self.connect_latency)
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.clients.add(ws)
+        try:
+            async for msg in ws:
+                if msg.type != WSMsgType.TEXT:
+                    continue
+                # Replies are independent, so a slow one never holds up the next
+                task = asyncio.create_task(self._handle_message(ws, msg.data))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+        finally:
+            self.clients.discard(ws)
+        return ws
+
+    async def _handle_message(self, ws: web.WebSocketResponse, data: str) -> None:
+        """Apply one request and send its reply, subject to the configured faults."""
+        try:
+            message = json.loads(data)
+            commands = json.loads(message["body"])["commands"]
+        except (ValueError, KeyError, TypeError):
+            logger.warning("Ignoring malformed request: %s", data)
+            return
+        for command in commands:
+            command_type = command.get("__type", "?")
+            self.stats[command_type] = self.stats.get(command_type, 0) + 1
+        delay = self.latency + random.uniform(0, self.jitter)
+        if delay:
+            await asyncio.sleep(delay)
+        if random.random() < self.drop_rate:
+            return
+        if random.random() < self.disconnect_rate:
+            await ws.close()
+            return
+        body = self._execute(commands)
+        if not ws.closed:
+            await ws.send_str(self._frame(message.get("uuid"), body))
+
+    def _frame(self, request_id: Optional[str], body: Dict[str, Any]) -> str:
+        """Return a frame carrying ``body``, with the uuid if the hub echoes them."""
+        frame: Dict[str, Any] = {"body": json.dumps(body)}
+        if self.echo_uuid:
+            frame["uuid"] = request_id
+        return json.dumps(frame)
+
+    def _execute(self, commands: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Apply commands to the state and return the reply body."""
+        if any(command.get("__type") == "GetFullDataEvent" for command in commands):
+            return self.state
+        changed: Dict[str, Dict[str, Any]] = {"aircons": {}, "zones": {}}
+        for command in commands:
+            result = self._apply(command)
+            if result is not None:
+                section, item_id = result
+                changed[section][item_id] = self.state[section][item_id]
+        if not self.reply_state:
+            return {}
+        return {section: items for section, items in changed.items() if items}
+
+    def _apply(self, command: Dict[str, Any]) -> Optional[tuple]:
+        """Apply one state-changing command; return the (section, id) it changed."""
+        # pylint: disable=too-many-return-statements
+        command_type = command.get("__type", "")
+        zone = self.state["zones"].get(command.get("zoneId"))
+        aircon = self.state["aircons"].get(command.get("airconId"))
+        if command_type == "SetZoneOpenClose" and zone is not None:
+            zone["isOn"] = bool(command.get("isOpen"))
+            return "zones", command["zoneId"]
+        if command_type == "SetAirconOnOff" and aircon is not None:
+            aircon["isOn"] = bool(command.get("isOn"))
+            return "aircons", command["airconId"]
+        if command_type == "SetAirconMode" and aircon is not None:
+            aircon["mode"] = command.get("mode")
+            return "aircons", command["airconId"]
+        if command_type.endswith("Temperature"):
+            field = "targetTemperatureHeat" if "Heat" in command_type else "targetTemperatureCool"
+            if command_type.startswith("SetZone") and zone is not None:
+                zone[field] = command.get("temperature")
+                return "zones", command["zoneId"]
+            if command_type.startswith("SetAircon") and aircon is not None:
+                aircon[field] = command.get("temperature")
+                return "aircons", command["airconId"]
+        logger.debug("Ignoring unsupported command: %s", command)
+        return None
+
+    async def _push_loop(self) -> None:
+        """Drift a random zone's temperature and push the change periodically."""
+        while True:
+            await asyncio.sleep(self.push_interval)
+            if not self.state["zones"]:
+                continue
+            zone_id = random.choice(list(self.state["zones"]))
+            zone = self.state["zones"][zone_id]
+            zone["temperatureSensorValue"] = round(
+                zone["temperatureSensorValue"] + random.uniform(-0.5, 0.5), 1)
+            await self.push({"zones": {zone_id: zone}})
+
+async def _async_main(args: argparse.Namespace) -> None:
+    """Run the simulator until interrupted."""
+    simulator = HubSimulator(
+        aircons=args.aircons,
+        zones=args.zones,
+        latency=args.latency,
+        jitter=args.jitter,
+        drop_rate=args.drop_rate,
+        disconnect_rate=args.disconnect_rate,
+        push_interval=args.push_interval,
+        reply_state=args.reply_state,
+        connect_latency=args.connect_latency,
+        client_id=args.client_id,
+        client_secret=args.client_secret,
+        echo_uuid=not args.no_echo_uuid,
+    )
+    await simulator.start(args.host, args.port)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await simulator.stop()
+        logger.info("Requests served: %s", simulator.stats)
+
+def main() -> None:
+    """Parse command-line options and run the simulator."""
+    parser = argparse.ArgumentParser(description="Simulate a MyPlaceIQ hub.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--aircons", type=int, default=1)
+    parser.add_argument("--zones", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.0,
+        help="seconds added to every reply")
+    parser.add_argument("--jitter", type=float, default=0.0,
+        help="extra random delay of up to this many seconds")
+    parser.add_argument("--drop-rate", type=float, default=0.0,
+        help="chance a request gets no reply")
+    parser.add_argument("--disconnect-rate", type=float, default=0.0,
+        help="chance the socket is closed instead of replying")
+    parser.add_argument("--push-interval", type=float, default=None,
+        help="seconds between pushed temperature events")
+    parser.add_argument("--reply-state", action="store_true",
+        help="include changed aircons and zones in command replies")
+    parser.add_argument("--connect-latency", type=float, default=0.0,
+        help="seconds added to every WebSocket handshake")
+    parser.add_argument("--no-echo-uuid", action="store_true",
+        help="omit the uuid from replies and events, like hubs that do not echo it")
+    parser.add_argument("--client-id", help="require this client_id header")
+    parser.add_argument("--client-secret", help="require this password header")
+    logging.basicConfig(level=logging.INFO)
+    try:
+        asyncio.run(_async_main(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""Latency and throughput benchmark for the MyPlaceIQ WebSocket transport.
+
+Runs ``MyPlaceIQ.send_command`` against a local :class:`HubSimulator` and
+reports p50/p95/p99 latency and commands per second for a sequential and a
+concurrent workload. ``--rtt`` is added to every reply and every WebSocket
+handshake, so transports that connect more often pay for it as they would on
+a real network.
+
+``--transport persistent`` measures the client as it is: one socket, with
+commands multiplexed over it. ``--transport reconnect`` gives every command
+a client and socket of its own, reproducing the old connect-per-command
+design::
+
+    python -m tools.transport_benchmark --rtt 0.03 --commands 200 --concurrency 8
+    python -m tools.transport_benchmark --rtt 0.03 --transport reconnect
+"""
+import argparse
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List
+
+import aiohttp
+
+from custom_components.myplaceiq.myplaceiq import MyPlaceIQ
+from tools.hub_simulator import HubSimulator
+
+# Cheap command the hub answers without changing state
+COMMAND = {"commands": [{"__type": "SetZoneOpenClose", "zoneId": "z1", "isOpen": True}]}
+TRANSPORTS = ("persistent", "reconnect")
+
+@dataclass(frozen=True)
+class WorkloadResult:
+    """Latency and throughput of one workload."""
+
+    workload: str
+    transport: str
+    commands: int
+    errors: int
+    elapsed: float
+    latencies: List[float]
+
+    @property
+    def throughput(self) -> float:
+        """Return completed commands per second."""
+        return len(self.latencies) / self.elapsed if self.elapsed else 0.0
+
+    def percentile(self, percent: float) -> float:
+        """Return the nearest-rank latency percentile in seconds."""
+        if not self.latencies:
+            return float("nan")
+        ordered = sorted(self.latencies)
+        rank = max(0, min(len(ordered) - 1, round(percent / 100 * len(ordered)) - 1))
+        return ordered[rank]
+
+    def as_row(self) -> Dict[str, Any]:
+        """Return the figures printed in the report, latencies in milliseconds."""
+        return {
+            "workload": self.workload,
+            "transport": self.transport,
+            "commands": self.commands,
+            "errors": self.errors,
+            "p50_ms": self.percentile(50) * 1000,
+            "p95_ms": self.percentile(95) * 1000,
+            "p99_ms": self.percentile(99) * 1000,
+            "cmd_per_s": self.throughput,
+        }
+
+class Transport:
+    """Sends commands to the simulator the way one transport design would."""
+
+    def __init__(self, name: str, port: int, session: aiohttp.ClientSession) -> None:
+        """Initialize the transport; ``persistent`` shares one client and socket."""
+        self.name = name
+        self._port = port
+        self._session = session
+        self._client = self._new_client() if name == "persistent" else None
+
+    def _new_client(self) -> MyPlaceIQ:
+        """Return a client for the simulator on the shared session."""
+        return MyPlaceIQ(
+            None, "127.0.0.1", self._port, "benchmark", "benchmark", session=self._session)
+
+    async def send(self) -> None:
+        """Send one command and wait for its reply."""
+        if self._client is not None:
+            await self._client.send_command(COMMAND)
+            return
+        # Connect-per-command: a socket of its own for every command
+        client = self._new_client()
+        try:
+            await client.send_command(COMMAND)
+        finally:
+            await client.close()
+
+    async def close(self) -> None:
+        """Close the persistent client, if any."""
+        if self._client is not None:
+            await self._client.close()
+
+async def run_workload(transport: Transport, commands: int, concurrency: int) -> WorkloadResult:
+    """Send ``commands`` commands with at most ``concurrency`` in flight."""
+    latencies: List[float] = []
+    slots = asyncio.Semaphore(concurrency)
+
+    async def timed_send() -> bool:
+        async with slots:
+            started = time.perf_counter()
+            try:
+                await transport.send()
+            except Exception: # pylint: disable=broad-except
+                return False
+            latencies.append(time.perf_counter() - started)
+            return True
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(timed_send() for _ in range(commands)))
+    elapsed = time.perf_counter() - started
+    return WorkloadResult(
+        workload="sequential" if concurrency == 1 else f"concurrent x{concurrency}",
+        transport=transport.name,
+        commands=commands,
+        errors=results.count(False),
+        elapsed=elapsed,
+        latencies=latencies,
+    )
+
+async def run_benchmark(
+    rtt: float, jitter: float, commands: int, concurrency: int, transport: str
+) -> List[WorkloadResult]:
+    """Run the sequential and concurrent workloads against a fresh simulator."""
+    # pylint: disable=too-many-arguments, too-many-positional-arguments
+    simulator = HubSimulator(latency=rtt, jitter=jitter, connect_latency=rtt)
+    port = await simulator.start()
+    session = aiohttp.ClientSession()
+    sender = Transport(transport, port, session)
+    try:
+        # Warm up the connection and the codec before timing anything
+        await sender.send()
+        return [
+            await run_workload(sender, commands, 1),
+            await run_workload(sender, commands, concurrency),
+        ]
+    finally:
+        await sender.close()
+        await session.close()
+        await simulator.stop()
+
+def format_report(results: List[WorkloadResult]) -> str:
+    """Return the results as a fixed-width table."""
+    lines = [
+        f"{'workload':<16} {'transport':<11} {'commands':>8} {'errors':>6} "
+        f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'cmd/s':>9}"
+    ]
+    for result in results:
+        row = result.as_row()
+        lines.append(
+            f"{row['workload']:<16} {row['transport']:<11} {row['commands']:>8} "
+            f"{row['errors']:>6} {row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} "
+            f"{row['p99_ms']:>8.1f} {row['cmd_per_s']:>9.1f}"
+        )
+    return "\n".join(lines)
+
+def main() -> None:
+    """Parse command-line options, run the benchmark and print the report."""
+    parser = argparse.ArgumentParser(
+        description="Benchmark MyPlaceIQ command latency and throughput.")
+    parser.add_argument("--rtt", type=float, default=0.02,
+        help="seconds added to every reply and handshake")
+    parser.add_argument("--jitter", type=float, default=0.0,
+        help="extra random reply delay of up to this many seconds")
+    parser.add_argument("--commands", type=int, default=100,
+        help="commands sent per workload")
+    parser.add_argument("--concurrency", type=int, default=8,
+        help="commands in flight in the concurrent workload")
+    parser.add_argument("--transport", choices=(*TRANSPORTS, "all"), default="all",
+        help="transport to measure")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    transports = TRANSPORTS if args.transport == "all" else (args.transport,)
+    results = []
+    for transport in transports:
+        results.extend(asyncio.run(run_benchmark(
+            args.rtt, args.jitter, args.commands, args.concurrency, transport)))
+    print(format_report(results))
+
+if __name__ == "__main__":
+    main()